@@ -1,12 +1,13 @@
 #!/bin/bash
 
-if [[ $#  -ne 3 ]] ; then
+if [[ $# -lt 3 ]] ; then
    echo "Need all arguments"
    echo "white or black as first parameter"
    echo "timeout as second parameter"
    echo "server ip as third parameter"
    echo "Example: $0 white 60 192.168.20.254"
+   echo "Other options: python3 player.py --help"
    exit 1
 fi
 
-python3 player.py  "$1" "$2" "$3"
+python3 player.py "$@"
@@ -0,0 +1,709 @@
+# The BitBoard class is an alternative backend for Board. It stores the game state as three 81-bit Python ints (one bit
+# per square, where square = x * 9 + y) for the white pieces, the black pieces and the KING, and checks the game rules
+# with masks precomputed at import time instead of indexing a NumPy array cell by cell.
+# It exposes the same methods as Board, so the engine can use either of them.
+
+import numpy as np
+
+import Move
+import symmetry
+import zobrist
+
+SIZE = 9
+CENTER = SIZE // 2
+SQUARES = SIZE * SIZE
+
+
+def square(x, y):
+    # return the index of the square at (x, y)
+    return x * SIZE + y
+
+
+def coordinates(sq):
+    # return the (x, y) coordinates of a square
+    return sq // SIZE, sq % SIZE
+
+
+def isCampSquare(x, y):
+    # same rule as Board.isCamp
+    centerCoors = (CENTER, CENTER + 1, CENTER - 1)
+    if ((x == 0 and y in centerCoors) or (x == SIZE - 1 and y in centerCoors) or
+            (y == 0 and x in centerCoors) or (y == SIZE - 1 and x in centerCoors)):
+        return True
+    if ((x == 1 and y == CENTER) or (x == SIZE - 2 and y == CENTER) or
+            (y == 1 and x == CENTER) or (y == SIZE - 2 and x == CENTER)):
+        return True
+    return False
+
+
+def squaresOf(mask):
+    # return the squares of the bits set in mask, from the lowest to the highest
+    squares = []
+    while mask:
+        low = mask & -mask
+        squares.append(low.bit_length() - 1)
+        mask ^= low
+    return squares
+
+
+# one bit per square
+BIT = [1 << sq for sq in range(SQUARES)]
+ALL = (1 << SQUARES) - 1
+THRONE_SQUARE = square(CENTER, CENTER)
+THRONE = BIT[THRONE_SQUARE]
+CAMPS = 0
+EDGES = 0
+for _x in range(SIZE):
+    for _y in range(SIZE):
+        if isCampSquare(_x, _y):
+            CAMPS |= BIT[square(_x, _y)]
+        if _x == 0 or _y == 0 or _x == SIZE - 1 or _y == SIZE - 1:
+            EDGES |= BIT[square(_x, _y)]
+
+# the four directions, in the order used by canWhiteEatFrom & co.: right, left, down, up
+DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+
+# for every square, its neighbours in the same order as Board.getNeighbours (up, down, left, right)
+NEIGHBOURS = []
+NEIGHBOUR_MASKS = []
+# for every square and direction, the squares from it to the edge of the board
+RAYS = []
+# for every square, the (neighbour, square beyond the neighbour) pairs checked by checkIfEat, in its order
+# (down, up, right, left); the square beyond is -1 when it is off the board
+CAPTURE_PAIRS = []
+# for every square, the pairs of opposite neighbours (attacker, square beyond the square) which can sandwich a piece
+# standing on it
+SANDWICHES = []
+for _sq in range(SQUARES):
+    _x, _y = coordinates(_sq)
+    _neighbours = []
+    for _dx, _dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+        if 0 <= _x + _dx < SIZE and 0 <= _y + _dy < SIZE:
+            _neighbours.append(square(_x + _dx, _y + _dy))
+    NEIGHBOURS.append(tuple(_neighbours))
+    NEIGHBOUR_MASKS.append(sum(BIT[n] for n in _neighbours))
+    _rays = []
+    for _dx, _dy in DIRECTIONS:
+        _ray = []
+        _i, _j = _x + _dx, _y + _dy
+        while 0 <= _i < SIZE and 0 <= _j < SIZE:
+            _ray.append(square(_i, _j))
+            _i, _j = _i + _dx, _j + _dy
+        _rays.append(tuple(_ray))
+    RAYS.append(tuple(_rays))
+    _pairs = []
+    for _dx, _dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+        if 0 <= _x + _dx < SIZE and 0 <= _y + _dy < SIZE:
+            _beyond = square(_x + 2 * _dx, _y + 2 * _dy) if 0 <= _x + 2 * _dx < SIZE and 0 <= _y + 2 * _dy < SIZE \
+                else -1
+            _pairs.append((square(_x + _dx, _y + _dy), _beyond))
+    CAPTURE_PAIRS.append(tuple(_pairs))
+    _sandwiches = []
+    for _dx, _dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+        if 0 <= _x + _dx < SIZE and 0 <= _y + _dy < SIZE and 0 <= _x - _dx < SIZE and 0 <= _y - _dy < SIZE:
+            _sandwiches.append((square(_x - _dx, _y - _dy), square(_x + _dx, _y + _dy)))
+    SANDWICHES.append(tuple(_sandwiches))
+NEAR_THRONE = NEIGHBOUR_MASKS[THRONE_SQUARE]
+# for every square, the squares of its row and column
+LINE_MASKS = []
+for _sq in range(SQUARES):
+    _x, _y = coordinates(_sq)
+    LINE_MASKS.append(sum(BIT[square(_x, _i)] for _i in range(SIZE)) | sum(BIT[square(_i, _y)] for _i in range(SIZE)))
+# for every square, the rows and columns of the square and of its neighbours: the lines whose pieces a capture
+# landing on the square may change
+CAPTURE_LINES = []
+for _sq in range(SQUARES):
+    _lines = LINE_MASKS[_sq]
+    for _n in NEIGHBOURS[_sq]:
+        _lines |= LINE_MASKS[_n]
+    CAPTURE_LINES.append(_lines)
+NEAR_CAMP = sum(BIT[sq] for sq in range(SQUARES) if NEIGHBOUR_MASKS[sq] & CAMPS)
+
+# the values of the pieces, the same used by Board
+EMPTY, WHITE, BLACK, KING = 0, 1, 2, 3
+
+
+def moveSegments(sq, ray):
+    # split a ray in the segments a piece standing on sq may move along on an empty board:
+    # - normal: the squares before the first camp or the throne
+    # - camp-internal: when sq is a camp, the squares of the same camp (a black piece can move in its camp until it
+    #   leaves it, but it cannot leave it and go on in the same move)
+    # - throne-passable: the squares behind the throne, empty under Ashton's rules since no piece crosses the throne
+    normal = []
+    for target in ray:
+        if CAMPS & BIT[target] or target == THRONE_SQUARE:
+            break
+        normal.append(target)
+    campInternal = []
+    if CAMPS & BIT[sq]:
+        for target in ray:
+            if not CAMPS & BIT[target]:
+                break
+            campInternal.append(target)
+    return tuple(normal), tuple(campInternal), ()
+
+
+def rayEntry(sq, targets):
+    # a ray of the move tables: (mask of the targets, whether the ray goes towards higher squares, distance between
+    # two squares of the ray, targets, moves)
+    step = abs(targets[0] - sq)
+    moves = tuple(Move.encode(sq, t) for t in targets)
+    return sum(BIT[t] for t in targets), targets[0] > sq, step, targets, moves
+
+
+# for every piece value and square, the rays the piece can move along on an empty board, ready for generateMoves:
+# the white pieces and the KING use the normal segments, the black pieces the camp-internal one when they start
+# inside a camp and the normal segment otherwise
+MOVE_TABLES = {WHITE: [], BLACK: [], KING: []}
+# for every square, the masks of the rays going from it to the edge of the board without meeting camps or the throne:
+# the lines along which the KING escapes when they are empty
+ESCAPE_RAYS = []
+for _sq in range(SQUARES):
+    _white, _black, _escapes = [], [], []
+    for _ray in RAYS[_sq]:
+        _normal, _camp, _throne = moveSegments(_sq, _ray)
+        if _normal and _normal == _ray:
+            _escapes.append(sum(BIT[t] for t in _ray))
+        if _normal:
+            _white.append(rayEntry(_sq, _normal + _throne))
+        if _camp or _normal:
+            _black.append(rayEntry(_sq, _camp or _normal))
+    MOVE_TABLES[WHITE].append(tuple(_white))
+    MOVE_TABLES[KING].append(tuple(_white))
+    MOVE_TABLES[BLACK].append(tuple(_black))
+    ESCAPE_RAYS.append(tuple(_escapes))
+
+
+def openLines(sq, occupied):
+    # return the number of lines from sq to the edge of the board with no pieces, camps or throne on them
+    return sum(1 for mask in ESCAPE_RAYS[sq] if not mask & occupied)
+
+
+# The threat flags used by the heuristic (canWhiteEatFrom, canWhiteBlockFrom and canBlackEatFrom of every piece) only
+# depend on the row and the column of the piece, so they are computed line by line: every row and column is read as
+# three 9-bit masks (white, black, KING) and the flags of its pieces come from a cache of the lines already seen.
+# The board keeps the flags of every line and, when a move is made, recomputes only the lines it touched.
+COLUMN_0 = sum(BIT[square(_x, 0)] for _x in range(SIZE))
+# multiplying the bits of column 0 by GATHER moves the bit of row x to bit 64 + x
+GATHER = sum(1 << (64 - 8 * _x) for _x in range(SIZE))
+# the bits of row x of column 0, for every 9-bit column mask
+COLUMN_SPREAD = [sum(BIT[square(_x, 0)] for _x in range(SIZE) if _bits >> _x & 1) for _bits in range(1 << SIZE)]
+
+
+def columnBits(mask, column):
+    # return the 9-bit mask (bit x for row x) of the squares of mask in the column
+    return ((mask >> column) & COLUMN_0) * GATHER >> 64 & 511
+
+
+def lineKind(squares):
+    # return the (camps, throne) 9-bit masks of a line of squares
+    return (sum(1 << i for i, sq in enumerate(squares) if CAMPS & BIT[sq]),
+            sum(1 << i for i, sq in enumerate(squares) if sq == THRONE_SQUARE))
+
+
+ROW_KINDS = [lineKind([square(_x, _y) for _y in range(SIZE)]) for _x in range(SIZE)]
+COLUMN_KINDS = [lineKind([square(_x, _y) for _x in range(SIZE)]) for _y in range(SIZE)]
+LINE_KINDS = sorted(set(ROW_KINDS + COLUMN_KINDS))
+ROW_KIND_INDEX = [LINE_KINDS.index(_kind) for _kind in ROW_KINDS]
+COLUMN_KIND_INDEX = [LINE_KINDS.index(_kind) for _kind in COLUMN_KINDS]
+# the flags of the lines already seen, by (kind, white, black, KING); cleared when it grows too much
+LINE_CACHE_SIZE = 1 << 20
+_lineCache = {}
+
+
+def computeLineThreats(kind, white, black, king):
+    # return the (white eat, white block, black eat) 9-bit flags of the pieces of a line, following the same rules
+    # as Board.canWhiteEatFrom, Board.canWhiteBlockFrom and Board.canBlackEatFrom along the line
+    camps, throne = LINE_KINDS[kind]
+    occupied = white | black | king
+    flags = [0, 0, 0]
+    for pieces, prey, anvil, eat, block in ((white, black, white | king | camps | throne, 0, 1),
+                                            (black, white, black | camps | throne, 2, None)):
+        for i in range(SIZE):
+            if not pieces >> i & 1:
+                continue
+            for step in (1, -1):
+                j = i + step
+                while 0 <= j < SIZE and not camps >> j & 1 and not occupied >> j & 1:
+                    j += step
+                if 0 <= j < SIZE and not camps >> j & 1 and prey >> j & 1:
+                    if block is not None:
+                        flags[block] |= 1 << i
+                    if not 0 <= j + step < SIZE or anvil >> (j + step) & 1:
+                        flags[eat] |= 1 << i
+    return tuple(flags)
+
+
+def lineThreats(kind, white, black, king):
+    # return the flags of a line, from the cache when the line was already seen
+    key = ((kind << SIZE | white) << SIZE | black) << SIZE | king
+    flags = _lineCache.get(key)
+    if flags is None:
+        if len(_lineCache) >= LINE_CACHE_SIZE:
+            _lineCache.clear()
+        flags = _lineCache[key] = computeLineThreats(kind, white, black, king)
+    return flags
+
+
+# the quadrants used by heuristics.black_good_moves (the middle row and column belong to two quadrants), in its order:
+# top right, top left, bottom right, bottom left
+_TOP, _BOTTOM = range(CENTER + 1), range(CENTER, SIZE)
+_LEFT, _RIGHT = range(CENTER + 1), range(CENTER, SIZE)
+QUADRANTS = tuple(sum(BIT[square(_x, _y)] for _x in _rows for _y in _columns)
+                  for _rows, _columns in ((_TOP, _RIGHT), (_TOP, _LEFT), (_BOTTOM, _RIGHT), (_BOTTOM, _LEFT)))
+
+
+def tableMoves(table, squares, occupied, moves, captures=0):
+    # append to moves the moves of the pieces on squares along the rays of table, each ray stops at the first
+    # occupied square; the moves ending on the captures mask get the Move.CAPTURE flag
+    for sq in squares:
+        for mask, forward, step, targets, rayMoves in table[sq]:
+            blockers = occupied & mask
+            if not blockers:
+                reachable = rayMoves
+            elif forward:
+                reachable = rayMoves[:((blockers & -blockers).bit_length() - 1 - sq) // step - 1]
+            else:
+                reachable = rayMoves[:(sq - blockers.bit_length() + 1) // step - 1]
+            if captures & mask:
+                moves.extend([move | Move.CAPTURE if captures & BIT[move % SQUARES] else move for move in reachable])
+            else:
+                moves.extend(reachable)
+    return moves
+
+
+def captureSquares(prey, anvil):
+    # return the mask of the squares where a piece eats one of the prey pieces, which happens when the square on the
+    # other side of the prey is in the anvil mask (see checkIfEat)
+    targets = 0
+    for sq in squaresOf(prey):
+        for attacker, beyond in SANDWICHES[sq]:
+            if anvil & BIT[beyond]:
+                targets |= BIT[attacker]
+    return targets
+
+
+def eatenSquare(to_, prey, anvil):
+    # return the prey square eaten by a piece moving to to_, in the order checked by checkIfEat, or -1
+    for neighbour, beyond in CAPTURE_PAIRS[to_]:
+        if prey & BIT[neighbour] and beyond != -1 and anvil & BIT[beyond]:
+            return neighbour
+    return -1
+
+
+def generateFromBitboards(board, player):
+    # return all the possible moves for the player on the (white, black, king) bitboards
+    white, black, king = board
+    occupied = white | black | king
+    if player.lower() == "white":
+        # the white pieces and then the KING, which does not eat
+        captures = captureSquares(black, white | king | CAMPS | THRONE)
+        moves = tableMoves(MOVE_TABLES[WHITE], squaresOf(white), occupied, [], captures)
+        return tableMoves(MOVE_TABLES[KING], squaresOf(king), occupied, moves)
+    elif player.lower() == "black":
+        captures = captureSquares(white, black | CAMPS | THRONE)
+        return tableMoves(MOVE_TABLES[BLACK], squaresOf(black), occupied, [], captures)
+    return []
+
+
+class BitBoard:
+
+    def __init__(self):
+        # set the KING on the throne
+        self.__king = THRONE
+        # set white pieces (in a cross shape around the throne) and black pieces (in the camps)
+        self.__white = 0
+        for i in (-2, -1, 1, 2):
+            self.__white |= BIT[square(CENTER + i, CENTER)] | BIT[square(CENTER, CENTER + i)]
+        self.__black = CAMPS
+        # the score of the board
+        self.__score = 0
+        # one (piece, from, to, captured squares, previous key) record for every move played with makeMove
+        self.__undo = []
+        # the Zobrist key of the position, updated by makeMove and unmakeMove
+        self.__key = self.computeKey()
+        # the keys of the 8 images of the position when symmetry is enabled, see symmetry.py
+        self.__symmetricKeys = self.computeSymmetricKeys()
+        # the threat flags of the pieces, updated by makeMove and unmakeMove
+        self.resetThreats()
+
+    # return the board as a (white, black, king) tuple of bitboards
+    def getBoard(self):
+        return self.__white, self.__black, self.__king
+
+    def setBitboards(self, white, black, king):
+        # set the position from the masks of the pieces
+        self.setBoard((white, black, king))
+
+    def setBoard(self, board):
+        self.__white, self.__black, self.__king = board
+        self.__undo = []
+        self.__key = self.computeKey()
+        self.__symmetricKeys = self.computeSymmetricKeys()
+        self.resetThreats()
+
+    def snapshot(self):
+        # return a copy of the position, for batcheval
+        return self.__white, self.__black, self.__king
+
+    def getKey(self):
+        # return the Zobrist key of the position
+        return self.__key
+
+    def computeKey(self):
+        # compute the Zobrist key of the position from scratch
+        return zobrist.keyOf(self.__pieces())
+
+    def __pieces(self):
+        # return the (piece, square) pairs of the position
+        return [(piece, sq) for piece, mask in ((WHITE, self.__white), (BLACK, self.__black), (KING, self.__king))
+                for sq in squaresOf(mask)]
+
+    def computeSymmetricKeys(self):
+        # compute the keys of the 8 images of the position, None when symmetry is not enabled
+        return symmetry.keysOf(self.__pieces()) if symmetry.enabled else None
+
+    def getCanonicalKey(self):
+        # return the canonical key of the position and the symmetry giving it (see symmetry.canonical)
+        keys = self.__symmetricKeys
+        return symmetry.canonical(keys if keys is not None else symmetry.keysOf(self.__pieces()))
+
+    def getKing(self):
+        # return the position of the KING, in the same format as np.where
+        if not self.__king:
+            return (), ()
+        x, y = coordinates(self.__king.bit_length() - 1)
+        return (x,), (y,)
+
+    def getKingSquare(self):
+        # return the square of the KING, -1 without a KING
+        return self.__king.bit_length() - 1
+
+    def getOccupied(self):
+        # return the mask of the occupied squares
+        return self.__white | self.__black | self.__king
+
+    def getPieceMasks(self):
+        # return the masks of the (white, black, KING) pieces
+        return self.__white, self.__black, self.__king
+
+    def getCenterCoordinate(self):
+        # return the coordinate of the center of the square board
+        return CENTER
+
+    def toArray(self):
+        # return the board as the 9x9 array used by Board
+        board = np.zeros((SIZE, SIZE), dtype=int)
+        for value, mask in ((1, self.__white), (2, self.__black), (3, self.__king)):
+            for sq in squaresOf(mask):
+                board[sq // SIZE][sq % SIZE] = value
+        return board
+
+    # return the board as a string
+    def __str__(self):
+        return str(self.toArray())
+
+    def getNeighbours(self, x, y):
+        # return the neighbours of the piece at (x, y)
+        return [coordinates(n) for n in NEIGHBOURS[square(x, y)]]
+
+    def isKingSurrounded(self):
+        # check if the KING is surrounded by the opponent's pieces
+        if self.__king & EDGES:
+            return False
+        return NEIGHBOUR_MASKS[self.__king.bit_length() - 1] & self.__black != 0
+
+    def isKingOnThrone(self):
+        # check if the KING is on the throne
+        return self.__king == THRONE
+
+    def isKingNearCamp(self):
+        # check if the KING is near the camp
+        return self.__king & NEAR_CAMP != 0
+
+    def isCamp(self, x, y):
+        # check if the piece at (x, y) is a camp
+        return 0 <= x < SIZE and 0 <= y < SIZE and CAMPS & BIT[square(x, y)] != 0
+
+    def isCenter(self, x, y):
+        # check if the piece at (x, y) is at the center of the board
+        return x == CENTER and y == CENTER
+
+    def nEnemiesCloseToKing(self):
+        # return the number of enemies close to the KING, 0 if the KING is on the edge of the board
+        if self.__king & EDGES:
+            return 0
+        return (NEIGHBOUR_MASKS[self.__king.bit_length() - 1] & self.__black).bit_count()
+
+    def isKingNearThrone(self):
+        # check if the KING is near the throne in the middle of the board
+        return self.__king & NEAR_THRONE != 0
+
+    def isKingAtEdge(self):
+        # check if the KING is at the edge of the board
+        return self.__king & EDGES != 0
+
+    def isKingCaptured(self):
+        # check if the KING is captured, with the same rules as Board.isKingCaptured
+        if self.__king & EDGES:
+            return False
+        king = self.__king.bit_length() - 1
+        black = self.__black
+        empty = ~(self.__white | black | self.__king)
+        up, down, left, right = king - SIZE, king + SIZE, king - 1, king + 1
+        enemies = self.nEnemiesCloseToKing()
+        if self.__king == THRONE and enemies == 4:
+            return True
+        if self.__king & NEAR_THRONE and enemies == 3:
+            return True
+        if self.__king & NEAR_CAMP and enemies == 1:
+            # check that the black piece is on the opposite side of the camp
+            for first, second in ((up, down), (down, up), (left, right), (right, left)):
+                if black & BIT[first] and empty & BIT[second]:
+                    return True
+        if enemies == 2:
+            # check that the black pieces are on the opposite sides of the king
+            if black & BIT[up] and black & BIT[down] or black & BIT[left] and black & BIT[right]:
+                return True
+        return False
+
+    def getWhitePieces(self):
+        # return the number of white pieces
+        return self.__white.bit_count()
+
+    def getBlackPieces(self):
+        # return the number of black pieces
+        return self.__black.bit_count()
+
+    def getWhitePositions(self):
+        # return the (x, y) positions of the white pieces
+        return [coordinates(sq) for sq in squaresOf(self.__white)]
+
+    def getBlackPositions(self):
+        # return the (x, y) positions of the black pieces
+        return [coordinates(sq) for sq in squaresOf(self.__black)]
+
+    # given a board, return all the possible moves for the player
+    def generateMoves(self, board, player):
+        # moves are ints packed by Move.encode, with the Move.CAPTURE flag on the moves eating a piece
+        return generateFromBitboards(board, player)
+
+    def openLinesToEdge(self, sq, vacated=-1):
+        # return the number of empty lines from sq to the edge of the board the KING could escape along, as if the
+        # square vacated was empty
+        occupied = self.__white | self.__black | self.__king
+        if vacated >= 0:
+            occupied &= ~BIT[vacated]
+        return openLines(sq, occupied)
+
+    def getValueAt(self, x, y):
+        # return the value of the piece at (x, y)
+        bit = BIT[square(x, y)]
+        if self.__white & bit:
+            return 1
+        if self.__black & bit:
+            return 2
+        if self.__king & bit:
+            return 3
+        return 0
+
+    def __lookAlong(self, ray):
+        # return the first square along ray holding a piece and the value of that piece, stopping at the camps
+        # and at the edge of the board, or (0, -1) if there is none
+        occupied = self.__white | self.__black | self.__king
+        for target in ray:
+            bit = BIT[target]
+            if CAMPS & bit:
+                break
+            if occupied & bit:
+                return self.getValueAt(target // SIZE, target % SIZE), target
+        return 0, -1
+
+    def __canEatFrom(self, sq, prey, anvil):
+        # check if the piece at sq has a prey in sight which is backed by the anvil mask or by the edge of the board
+        for ray in RAYS[sq]:
+            element, target = self.__lookAlong(ray)
+            if element == prey:
+                beyond = ray.index(target) + 1
+                if beyond == len(ray) or anvil & BIT[ray[beyond]]:
+                    return True
+        return False
+
+    def canWhiteEatFrom(self, x, y):
+        # check if the piece at (x, y) can eat a black piece going right, left, down or up
+        return self.__canEatFrom(square(x, y), 2, self.__white | self.__king | CAMPS | THRONE)
+
+    def canWhiteBlockFrom(self, x, y):
+        # check if the piece at (x, y) can block a black piece going right, left, down or up
+        sq = square(x, y)
+        for ray in RAYS[sq]:
+            if self.__lookAlong(ray)[0] == 2:
+                return True
+        return False
+
+    def canBlackEatFrom(self, x, y):
+        # check if the piece at (x, y) can eat a white piece going right, left, down or up
+        return self.__canEatFrom(square(x, y), 1, self.__black | CAMPS | THRONE)
+
+    def movePiece(self, move):
+        # return a new board (white, black, king) with the piece moved
+        x1, y1 = coordinates(Move.fromSquare(move))
+        x2, y2 = coordinates(Move.toSquare(move))
+        white, black, king = self.__white, self.__black, self.__king
+        origin = BIT[square(x1, y1)]
+        moving = origin | BIT[square(x2, y2)]
+        if white & origin:
+            white ^= moving
+        elif black & origin:
+            black ^= moving
+        elif king & origin:
+            king ^= moving
+        x3, y3 = self.checkIfEat(x1, y1, x2, y2)
+        if x3 != -1:
+            eaten = ~BIT[square(x3, y3)]
+            white &= eaten
+            black &= eaten
+        return white, black, king
+
+    def checkIfEat(self, x, y, xnew, ynew):
+        # check if the piece at (x, y) eats a piece by doing the move, returning the position of the eaten piece
+        origin = BIT[square(x, y)]
+        if self.__white & origin:
+            prey = self.__black
+            anvil = self.__white | self.__king | CAMPS | THRONE
+        elif self.__black & origin:
+            prey = self.__white
+            anvil = self.__black | CAMPS | THRONE
+        else:
+            return -1, -1
+        eaten = eatenSquare(square(xnew, ynew), prey, anvil)
+        if eaten == -1:
+            return -1, -1
+        return coordinates(eaten)
+
+    def makeMove(self, move):
+        # play the move on this board, eating the sandwiched piece, and push its undo record
+        from_ = (move & Move.PLAIN) // SQUARES
+        to_ = (move & Move.PLAIN) % SQUARES
+        origin = BIT[from_]
+        moving = origin | BIT[to_]
+        captured = ()
+        key = self.__key
+        if self.__white & origin:
+            piece = WHITE
+            eaten = eatenSquare(to_, self.__black, self.__white | self.__king | CAMPS | THRONE)
+            self.__white ^= moving
+            if eaten != -1:
+                self.__black ^= BIT[eaten]
+                self.__key ^= zobrist.KEYS[BLACK][eaten]
+                captured = (eaten,)
+        elif self.__black & origin:
+            piece = BLACK
+            eaten = eatenSquare(to_, self.__white, self.__black | CAMPS | THRONE)
+            self.__black ^= moving
+            if eaten != -1:
+                self.__white ^= BIT[eaten]
+                self.__key ^= zobrist.KEYS[WHITE][eaten]
+                captured = (eaten,)
+        else:
+            piece = KING
+            self.__king ^= moving
+        self.__key ^= zobrist.KEYS[piece][from_] ^ zobrist.KEYS[piece][to_]
+        self.__undo.append((piece, from_, to_, captured, key))
+        if self.__symmetricKeys is not None:
+            symmetry.moveKeys(self.__symmetricKeys, piece, from_, to_, BLACK if piece == WHITE else WHITE, captured)
+        self.__updateThreats(from_, to_, captured)
+
+    def unmakeMove(self):
+        # take back the last move played with makeMove
+        piece, from_, to_, captured, self.__key = self.__undo.pop()
+        moving = BIT[from_] | BIT[to_]
+        if piece == WHITE:
+            self.__white ^= moving
+            for sq in captured:
+                self.__black |= BIT[sq]
+        elif piece == BLACK:
+            self.__black ^= moving
+            for sq in captured:
+                self.__white |= BIT[sq]
+        else:
+            self.__king ^= moving
+        if self.__symmetricKeys is not None:
+            symmetry.moveKeys(self.__symmetricKeys, piece, from_, to_, BLACK if piece == WHITE else WHITE, captured)
+        self.__updateThreats(from_, to_, captured)
+
+    def resetThreats(self):
+        # compute the threat flags of every line from scratch
+        # the flags of every row and column, shifted to their squares: (white eat, white block, black eat)
+        self.__rowThreats = [(0, 0, 0)] * SIZE
+        self.__columnThreats = [(0, 0, 0)] * SIZE
+        # the flags of all the rows and of all the columns, the flag of a piece is set if its row or column sets it
+        self.__rowFlags = [0, 0, 0]
+        self.__columnFlags = [0, 0, 0]
+        for line in range(SIZE):
+            self.__updateRow(line)
+            self.__updateColumn(line)
+
+    def __updateRow(self, row):
+        shift = row * SIZE
+        new = tuple(flags << shift for flags in lineThreats(ROW_KIND_INDEX[row], self.__white >> shift & 511,
+                                                            self.__black >> shift & 511, self.__king >> shift & 511))
+        old = self.__rowThreats[row]
+        if new != old:
+            # the rows do not overlap, so XOR takes the old flags out and puts the new ones in
+            self.__rowThreats[row] = new
+            self.__rowFlags = [flags ^ old[i] ^ new[i] for i, flags in enumerate(self.__rowFlags)]
+
+    def __updateColumn(self, column):
+        new = tuple(COLUMN_SPREAD[flags] << column for flags in lineThreats(
+            COLUMN_KIND_INDEX[column], columnBits(self.__white, column), columnBits(self.__black, column),
+            columnBits(self.__king, column)))
+        old = self.__columnThreats[column]
+        if new != old:
+            self.__columnThreats[column] = new
+            self.__columnFlags = [flags ^ old[i] ^ new[i] for i, flags in enumerate(self.__columnFlags)]
+
+    def __updateThreats(self, from_, to_, captured):
+        # recompute the lines crossing the squares changed by a move
+        rows = {from_ // SIZE, to_ // SIZE}
+        columns = {from_ % SIZE, to_ % SIZE}
+        for sq in captured:
+            rows.add(sq // SIZE)
+            columns.add(sq % SIZE)
+        for row in rows:
+            self.__updateRow(row)
+        for column in columns:
+            self.__updateColumn(column)
+
+    def countWhiteEaters(self):
+        # return the number of white pieces which canWhiteEatFrom their square
+        return (self.__rowFlags[0] | self.__columnFlags[0]).bit_count()
+
+    def countWhiteBlockers(self):
+        # return the number of white pieces which canWhiteBlockFrom their square
+        return (self.__rowFlags[1] | self.__columnFlags[1]).bit_count()
+
+    def countBlackEaters(self):
+        # return the number of black pieces which canBlackEatFrom their square
+        return (self.__rowFlags[2] | self.__columnFlags[2]).bit_count()
+
+    def getBlackQuadrantCounts(self):
+        # return the number of black pieces in the top right, top left, bottom right and bottom left quadrants
+        black = self.__black
+        return tuple((black & quadrant).bit_count() for quadrant in QUADRANTS)
+
+    def convertBoard(self, board):
+        # convert the board received from the server to bitboards
+        self.__white = self.__black = self.__king = 0
+        self.__undo = []
+        for i in range(SIZE):
+            for j in range(SIZE):
+                if board[i][j] == "WHITE":
+                    self.__white |= BIT[square(i, j)]
+                elif board[i][j] == "BLACK":
+                    self.__black |= BIT[square(i, j)]
+                elif board[i][j] == "KING":
+                    self.__king |= BIT[square(i, j)]
+        self.__key = self.computeKey()
+        self.__symmetricKeys = self.computeSymmetricKeys()
+        self.resetThreats()
@@ -2,6 +2,11 @@
 
 import numpy as np
 
+import BitBoard
+import Move
+import symmetry
+import zobrist
+
 
 class Board:
 
@@ -31,6 +36,10 @@ class Board:
         self.__board[self.__size - 2][self.getCenterCoordinate()] = 2
         # the score of the board
         self.__score = 0
+        # one (piece, from, to, captured squares, previous key) record for every move played with makeMove
+        self.__undo = []
+        # the Zobrist key of the position, updated by makeMove and unmakeMove
+        self.__key = self.computeKey()
 
     # return the board
     def getBoard(self):
@@ -40,6 +49,25 @@ class Board:
         # return the position of the KING
         return np.where(self.__board == 3)
 
+    def getKingSquare(self):
+        # return the square of the KING (see BitBoard.square), -1 without a KING
+        squares = np.flatnonzero(self.__board == 3)
+        return int(squares[0]) if len(squares) else -1
+
+    def getOccupied(self):
+        # return the mask of the occupied squares (see BitBoard.py)
+        occupied = 0
+        for sq in np.flatnonzero(self.__board):
+            occupied |= BitBoard.BIT[sq]
+        return occupied
+
+    def getPieceMasks(self):
+        # return the masks of the (white, black, KING) pieces (see BitBoard.py)
+        masks = [0, 0, 0]
+        for sq in np.flatnonzero(self.__board):
+            masks[self.__board.flat[sq] - 1] |= BitBoard.BIT[sq]
+        return tuple(masks)
+
     def getCenterCoordinate(self):
         # return the coordinate of the center of the square board
         return self.__size // 2
@@ -178,309 +206,108 @@ class Board:
                 return True
         return False
 
-    # check if this works
     def getWhitePieces(self):
         # return the number of white pieces
-        return self.getBoard().tolist().count(1)
+        return int(np.count_nonzero(self.__board == 1))
 
     def getBlackPieces(self):
         # return the number of black pieces
-        return self.getBoard().tolist().count(2)
+        return int(np.count_nonzero(self.__board == 2))
+
+    def getWhitePositions(self):
+        # return the (x, y) positions of the white pieces
+        return list(zip(*np.where(self.__board == 1)))
+
+    def getBlackPositions(self):
+        # return the (x, y) positions of the black pieces
+        return list(zip(*np.where(self.__board == 2)))
 
     # given a board, return all the possible moves for the player
     def generateMoves(self, board, player):
-        # moves are in format "xy_xnewynew"
-        moves = []
-        if player.lower() == "white":
-            # get the position of all the white pieces + the king
-            whitePieces = np.where(board == 1)
-            king = np.where(board == 3)
-            for i in range(len(whitePieces[0])):
-                x = whitePieces[0][i]
-                y = whitePieces[1][i]
-                # check every possible move for the white piece
-                j = 1
-                # array of flags to check if the piece can move in a certain direction
-                flags = [True, True, True, True]
-                while j < self.__size:
-                    if x - j >= 0 and board[x - j][y] == 0 and not self.isCamp(x - j, y) and not self.isCenter(x - j,
-                                                                                                               y) and \
-                            flags[0]:
-                        moves.append(str(x) + str(y) + "_" + str(x - j) + str(y))
-                    else:
-                        flags[0] = False
-                    if x + j < self.__size and board[x + j][y] == 0 and not self.isCamp(x + j, y) and \
-                            not self.isCenter(x + j, y) and flags[1]:
-                        moves.append(str(x) + str(y) + "_" + str(x + j) + str(y))
-                    else:
-                        flags[1] = False
-                    if y - j >= 0 and board[x][y - j] == 0 and not self.isCamp(x, y - j) and not self.isCenter(x, y - j) \
-                            and flags[2]:
-                        moves.append(str(x) + str(y) + "_" + str(x) + str(y - j))
-                    else:
-                        flags[2] = False
-                    if y + j < self.__size and board[x][y + j] == 0 and not self.isCamp(x, y + j) and not self.isCenter(
-                            x, y + j) \
-                            and flags[3]:
-                        moves.append(str(x) + str(y) + "_" + str(x) + str(y + j))
-                    else:
-                        flags[3] = False
-                    j += 1
-            # check the king's moves
-            x = king[0][0]
-            y = king[1][0]
-            j = 1
-            flags = [True, True, True, True]
-            while j < self.__size:
-                if self.getCenterCoordinate() != x or self.getCenterCoordinate() != y:
-                    if x - j >= 0 and board[x - j][y] == 0 and not self.isCamp(x - j, y) and not self.isCenter(x - j,
-                                                                                                               y) and \
-                            flags[0]:
-                        moves.append(str(x) + str(y) + "_" + str(x - j) + str(y))
-                    else:
-                        flags[0] = False
-                    if x + j < self.__size and board[x + j][y] == 0 and not self.isCamp(x + j, y) and flags[1] \
-                            and not self.isCenter(x + j, y):
-                        moves.append(str(x) + str(y) + "_" + str(x + j) + str(y))
-                    else:
-                        flags[1] = False
-                    if y - j >= 0 and board[x][y - j] == 0 and not self.isCamp(x, y - j) and flags[2] \
-                            and not self.isCenter(x, y - j):
-                        moves.append(str(x) + str(y) + "_" + str(x) + str(y - j))
-                    else:
-                        flags[2] = False
-                    if y + j < self.__size and board[x][y + j] == 0 and not self.isCamp(x, y + j) and flags[3] \
-                            and not self.isCenter(x, y + j):
-                        moves.append(str(x) + str(y) + "_" + str(x) + str(y + j))
-                    else:
-                        flags[3] = False
-                    j += 1
-                else:
-                    # cases in which the king is in the castle:
-                    if x - j >= 0 and board[x - j][y] == 0 and not self.isCamp(x - j, y) and flags[0]:
-                        moves.append(str(x) + str(y) + "_" + str(x - j) + str(y))
-                    else:
-                        flags[0] = False
-                    if x + j < self.__size and board[x + j][y] == 0 and not self.isCamp(x + j, y) and flags[1]:
-                        moves.append(str(x) + str(y) + "_" + str(x + j) + str(y))
-                    else:
-                        flags[1] = False
-                    if y - j >= 0 and board[x][y - j] == 0 and not self.isCamp(x, y - j) and flags[2]:
-                        moves.append(str(x) + str(y) + "_" + str(x) + str(y - j))
-                    else:
-                        flags[2] = False
-                    if y + j < self.__size and board[x][y + j] == 0 and not self.isCamp(x, y + j) and flags[3]:
-                        moves.append(str(x) + str(y) + "_" + str(x) + str(y + j))
-                    else:
-                        flags[3] = False
-                    j += 1
-        elif player.lower() == "black":
-            # get the position of all the black pieces
-            blackPieces = np.where(board == 2)
-            for i in range(len(blackPieces[0])):
-                x = blackPieces[0][i]
-                y = blackPieces[1][i]
-                j = 1
-                # array of flags to check if the piece can move in a certain direction
-                flags = [True, True, True, True, True, True, True, True]
-                while j < self.__size:
-                    if x - j >= 0 and board[x - j][y] == 0 and not self.isCamp(x - j, y) and not self.isCenter(x - j, y) \
-                            and flags[0]:
-                        moves.append(str(x) + str(y) + "_" + str(x - j) + str(y))
-                    else:
-                        flags[0] = False
-                    if x + j < self.__size and board[x + j][y] == 0 and not self.isCamp(x + j, y) and \
-                            not self.isCenter(x + j, y) and flags[1]:
-                        moves.append(str(x) + str(y) + "_" + str(x + j) + str(y))
-                    else:
-                        flags[1] = False
-                    if y - j >= 0 and board[x][y - j] == 0 and not self.isCamp(x, y - j) and not self.isCenter(x, y - j) \
-                            and flags[2]:
-                        moves.append(str(x) + str(y) + "_" + str(x) + str(y - j))
-                    else:
-                        flags[2] = False
-                    if y + j < self.__size and board[x][y + j] == 0 and not self.isCamp(x, y + j) and not self.isCenter(
-                            x, y + j) \
-                            and flags[3]:
-                        moves.append(str(x) + str(y) + "_" + str(x) + str(y + j))
-                    else:
-                        flags[3] = False
-                    # check every possible move for the black piece, black pieces can move in a camp until they leave it
-                    if x - j >= 0 and board[x - j][y] == 0 and self.isCamp(x, y) and self.isCamp(x - j,
-                                                                                                 y) and not self.isCenter(
-                        x - j, y) and flags[4]:
-                        moves.append(str(x) + str(y) + "_" + str(x - j) + str(y))
-                    else:
-                        flags[4] = False
-                    if x + j < self.__size and board[x + j][y] == 0 and self.isCamp(x, y) and \
-                            self.isCamp(x + j, y) and not self.isCenter(x + j, y) and flags[5]:
-                        moves.append(str(x) + str(y) + "_" + str(x + j) + str(y))
-                    else:
-                        flags[5] = False
-                    if y - j >= 0 and board[x][y - j] == 0 and self.isCamp(x, y) and self.isCamp(x,
-                                                                                                 y - j) and not self.isCenter(
-                        x, y - j) and flags[6]:
-                        moves.append(str(x) + str(y) + "_" + str(x) + str(y - j))
-                    else:
-                        flags[6] = False
-                    if y + j < self.__size and board[x][y + 1] == 0 and self.isCamp(x, y) and \
-                            self.isCamp(x, y + j) and not self.isCenter(x, y + j) and flags[7]:
-                        moves.append(str(x) + str(y) + "_" + str(x) + str(y + j))
-                    else:
-                        flags[7] = False
-                    j += 1
-        return moves
+        # moves are ints packed by Move.encode, they are read from the move tables built by BitBoard at import time
+        bitboards = [0, 0, 0]
+        flat = board.ravel()
+        for sq in np.flatnonzero(flat):
+            bitboards[flat[sq] - 1] |= BitBoard.BIT[sq]
+        return BitBoard.generateFromBitboards(bitboards, player)
+
+    def openLinesToEdge(self, sq, vacated=-1):
+        # return the number of empty lines from sq to the edge of the board the KING could escape along, as if the
+        # square vacated was empty
+        occupied = 0
+        for occupied_sq in np.flatnonzero(self.__board):
+            if occupied_sq != vacated:
+                occupied |= BitBoard.BIT[occupied_sq]
+        return BitBoard.openLines(sq, occupied)
 
     def getValueAt(self, x, y):
         # return the value of the piece at (x, y)
         return self.__board[x][y]
 
-    def canWhiteEatFrom(self, x, y):
-        element = 0
-        inc = 1
-        # check if the piece at (x, y) can eat a black piece going right
-        while element == 0:
-            if self.isCamp(x, y + inc) or y + inc == self.__size:
-                break
-            element = self.getValueAt(x, y + inc)
-            inc += 1
-        if element == 2 and (
-                y + inc == self.__size or self.getValueAt(x, y + inc) == 1 or self.getValueAt(x, y + inc) == 3) or \
-                self.isCamp(x, y + inc) or self.isCenter(x, y + inc):
-            return True
-        element = 0
-        # check if the piece at (x, y) can eat a black piece going left
-        inc = -1
-        while element == 0:
-            if self.isCamp(x, y + inc) or y + inc == self.__size:
-                break
-            element = self.getValueAt(x, y + inc)
-            inc -= 1
-        if element == 2 and (
-                y + inc == self.__size or self.getValueAt(x, y + inc) == 1 or self.getValueAt(x, y + inc) == 3) or \
-                self.isCamp(x, y + inc) or self.isCenter(x, y + inc):
-            return True
-        # check if the piece at (x, y) can eat a black piece going down
-        inc = 1
-        while element == 0:
-            if self.isCamp(x + inc, y) or x + inc == self.__size:
-                break
-            element = self.getValueAt(x + inc, y)
-            inc += 1
-        if element == 2 and (
-                x + inc == self.__size or self.getValueAt(x + inc, y) == 1 or self.getValueAt(x + inc, y) == 3) or \
-                self.isCamp(x + inc, y) or self.isCenter(x + inc, y):
-            return True
-        # check if the piece at (x, y) can eat a black piece going up
-        inc = -1
-        while element == 0:
-            if self.isCamp(x + inc, y) or x + inc == self.__size:
-                break
-            element = self.getValueAt(x + inc, y)
-            inc -= 1
-        if element == 2 and (
-                x + inc == self.__size or self.getValueAt(x + inc, y) == 1 or self.getValueAt(x + inc, y) == 3) or \
-                self.isCamp(x + inc, y) or self.isCenter(x + inc, y):
-            return True
+    def __lookAlong(self, x, y, dx, dy):
+        # return the value and the position of the first piece met going from (x, y) in the direction (dx, dy),
+        # stopping at the camps and at the edge of the board, or (0, -1, -1) if there is none
+        x, y = x + dx, y + dy
+        while 0 <= x < self.__size and 0 <= y < self.__size and not self.isCamp(x, y):
+            if self.getValueAt(x, y) != 0:
+                return self.getValueAt(x, y), x, y
+            x, y = x + dx, y + dy
+        return 0, -1, -1
+
+    def __canEatFrom(self, x, y, prey, allies):
+        # check if the piece at (x, y) has a prey in sight which is backed by one of its allies, a camp, the throne or
+        # the edge of the board, going right, left, down and up
+        for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0)):
+            element, xprey, yprey = self.__lookAlong(x, y, dx, dy)
+            if element == prey:
+                xnext, ynext = xprey + dx, yprey + dy
+                if not (0 <= xnext < self.__size and 0 <= ynext < self.__size) or \
+                        self.getValueAt(xnext, ynext) in allies or self.isCamp(xnext, ynext) or \
+                        self.isCenter(xnext, ynext):
+                    return True
         return False
 
+    def canWhiteEatFrom(self, x, y):
+        # check if the piece at (x, y) can eat a black piece going right, left, down or up
+        return self.__canEatFrom(x, y, 2, (1, 3))
+
     def canWhiteBlockFrom(self, x, y):
-        element = 0
-        inc = 1
-        # check if the piece at (x, y) can block a black piece going right
-        while element == 0:
-            if y + inc == self.__size or self.isCamp(x, y + inc):
-                break
-            element = self.getValueAt(x, y + inc)
-            inc += 1
-        if element == 2:
-            return True
-        element = 0
-        # check if the piece at (x, y) can eat a black piece going left
-        inc = -1
-        while element == 0:
-            if y + inc == self.__size or self.isCamp(x, y + inc):
-                break
-            element = self.getValueAt(x, y + inc)
-            inc -= 1
-        if element == 2:
-            return True
-        # check if the piece at (x, y) can eat a black piece going down
-        inc = 1
-        while element == 0:
-            if x + inc == self.__size or self.isCamp(x + inc, y):
-                break
-            element = self.getValueAt(x + inc, y)
-            inc += 1
-        if element == 2:
-            return True
-        # check if the piece at (x, y) can eat a black piece going up
-        inc = -1
-        while element == 0:
-            if x + inc == self.__size or self.isCamp(x + inc, y):
-                break
-            element = self.getValueAt(x + inc, y)
-            inc -= 1
-        if element == 2:
-            return True
+        # check if the piece at (x, y) can block a black piece going right, left, down or up
+        for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0)):
+            if self.__lookAlong(x, y, dx, dy)[0] == 2:
+                return True
         return False
 
     def canBlackEatFrom(self, x, y):
-        element = 0
-        inc = 1
-        # check if the piece at (x, y) can eat a white piece going right
-        while element == 0:
-            if self.isCamp(x, y + inc) or y + inc == self.__size:
-                break
-            element = self.getValueAt(x, y + inc)
-            inc += 1
-        if element == 1 and (
-                y + inc == self.__size or self.getValueAt(x, y + inc) == 2) or self.isCamp(x, y + inc) or \
-                self.isCenter(x, y + inc):
-            return True
-        element = 0
-        # check if the piece at (x, y) can eat a white piece going left
-        inc = -1
-        while element == 0:
-            if self.isCamp(x, y + inc) or y + inc == self.__size:
-                break
-            element = self.getValueAt(x, y + inc)
-            inc -= 1
-        if element == 1 and (
-                y + inc == self.__size or self.getValueAt(x, y + inc) == 2) or \
-                self.isCamp(x, y + inc) or self.isCenter(x, y + inc):
-            return True
-        # check if the piece at (x, y) can eat a white piece going down
-        inc = 1
-        while element == 0:
-            if self.isCamp(x + inc, y) or x + inc == self.__size:
-                break
-            element = self.getValueAt(x + inc, y)
-            inc += 1
-        if element == 1 and (
-                x + inc == self.__size or self.getValueAt(x + inc, y) == 2) or \
-                self.isCamp(x + inc, y) or self.isCenter(x + inc, y):
-            return True
-        # check if the piece at (x, y) can eat a white piece going up
-        inc = -1
-        while element == 0:
-            if self.isCamp(x + inc, y) or x + inc == self.__size:
-                break
-            element = self.getValueAt(x + inc, y)
-            inc -= 1
-        if element == 1 and (
-                x + inc == self.__size or self.getValueAt(x + inc, y) == 2) or \
-                self.isCamp(x + inc, y) or self.isCenter(x + inc, y):
-            return True
-        return False
+        # check if the piece at (x, y) can eat a white piece going right, left, down or up
+        return self.__canEatFrom(x, y, 1, (2,))
+
+    def countWhiteEaters(self):
+        # return the number of white pieces which canWhiteEatFrom their square
+        return sum(1 for x, y in self.getWhitePositions() if self.canWhiteEatFrom(x, y))
+
+    def countWhiteBlockers(self):
+        # return the number of white pieces which canWhiteBlockFrom their square
+        return sum(1 for x, y in self.getWhitePositions() if self.canWhiteBlockFrom(x, y))
+
+    def countBlackEaters(self):
+        # return the number of black pieces which canBlackEatFrom their square
+        return sum(1 for x, y in self.getBlackPositions() if self.canBlackEatFrom(x, y))
+
+    def getBlackQuadrantCounts(self):
+        # return the number of black pieces in the top right, top left, bottom right and bottom left quadrants (the
+        # pieces on the middle row and column belong to two quadrants)
+        center = self.getCenterCoordinate()
+        black = self.__board == 2
+        quadrants = (black[:center + 1, center:], black[:center + 1, :center + 1], black[center:, center:],
+                     black[center:, :center + 1])
+        return tuple(int(np.count_nonzero(quadrant)) for quadrant in quadrants)
 
     def movePiece(self, move):
         # return a new board with the piece moved
         newBoard = self.getBoard().copy()
-        x1 = int(move[0])
-        y1 = int(move[1])
-        x2 = int(move[3])
-        y2 = int(move[4])
+        x1, y1 = divmod(Move.fromSquare(move), self.__size)
+        x2, y2 = divmod(Move.toSquare(move), self.__size)
         newBoard[x2][y2] = newBoard[x1][y1]
         newBoard[x1][y1] = 0
         x3, y3 = self.checkIfEat(x1, y1, x2, y2)
@@ -488,6 +315,32 @@ class Board:
             newBoard[x3][y3] = 0
         return newBoard
 
+    def makeMove(self, move):
+        # play the move on this board, eating the sandwiched piece, and push its undo record
+        x1, y1 = divmod(Move.fromSquare(move), self.__size)
+        x2, y2 = divmod(Move.toSquare(move), self.__size)
+        piece = int(self.__board[x1][y1])
+        x3, y3 = self.checkIfEat(x1, y1, x2, y2)
+        self.__board[x2][y2] = piece
+        self.__board[x1][y1] = 0
+        captured = ()
+        key = self.__key
+        if x3 != -1:
+            self.__key ^= zobrist.KEYS[self.__board[x3][y3]][x3 * self.__size + y3]
+            self.__board[x3][y3] = 0
+            captured = (x3 * self.__size + y3,)
+        from_, to_ = x1 * self.__size + y1, x2 * self.__size + y2
+        self.__key ^= zobrist.KEYS[piece][from_] ^ zobrist.KEYS[piece][to_]
+        self.__undo.append((piece, from_, to_, captured, key))
+
+    def unmakeMove(self):
+        # take back the last move played with makeMove, the eaten pieces belong to the opponent of the moving one
+        piece, from_, to_, captured, self.__key = self.__undo.pop()
+        self.__board.flat[from_] = piece
+        self.__board.flat[to_] = 0
+        for sq in captured:
+            self.__board.flat[sq] = 1 if piece == 2 else 2
+
     def checkIfEat(self, x, y, xnew, ynew):
         # check if the piece at (x, y) eats a piece by doing the move
         # first lets check it for white pieces, so basically we check if ther's a black piece near it
@@ -529,6 +382,7 @@ class Board:
     def convertBoard(self, board):
         # convert the board to a 2D array
         self.__board = np.zeros((self.__size, self.__size), dtype=int)
+        self.__undo = []
         for i in range(self.__size):
             for j in range(self.__size):
                 if board[i][j] == "WHITE":
@@ -537,6 +391,35 @@ class Board:
                     self.__board[i][j] = 2
                 elif board[i][j] == "KING":
                     self.__board[i][j] = 3
+        self.__key = self.computeKey()
+
+    def setBitboards(self, white, black, king):
+        # set the position from the masks of the pieces (see BitBoard.py)
+        board = np.zeros(self.__size * self.__size, dtype=int)
+        for value, mask in ((1, white), (2, black), (3, king)):
+            board[BitBoard.squaresOf(mask)] = value
+        self.setBoard(board.reshape(self.__size, self.__size))
 
     def setBoard(self, board):
         self.__board = board
+        self.__undo = []
+        self.__key = self.computeKey()
+
+    def snapshot(self):
+        # return a copy of the position, for batcheval
+        return self.__board.copy()
+
+    def getKey(self):
+        # return the Zobrist key of the position
+        return self.__key
+
+    def computeKey(self):
+        # compute the Zobrist key of the position from scratch
+        flat = self.__board.ravel()
+        return zobrist.keyOf((int(flat[sq]), int(sq)) for sq in np.flatnonzero(flat))
+
+    def getCanonicalKey(self):
+        # return the canonical key of the position and the symmetry giving it (see symmetry.canonical), computed from
+        # scratch
+        flat = self.__board.ravel()
+        return symmetry.canonical(symmetry.keysOf((int(flat[sq]), int(sq)) for sq in np.flatnonzero(flat)))
@@ -1,3 +1,56 @@
+# Moves are packed in an int: from-square * 81 + to-square, where the square at (x, y) is x * 9 + y, with the CAPTURE
+# flag set on the moves that eat a piece. They are converted to the server's notation only when they are sent.
+
+SIZE = 9
+SQUARES = SIZE * SIZE
+# set on the moves that eat a piece
+CAPTURE = 1 << 13
+# the bits holding the squares of a move
+PLAIN = CAPTURE - 1
+
+
+def encode(from_, to_):
+    # return the move from square from_ to square to_
+    return from_ * SQUARES + to_
+
+
+def fromSquare(move):
+    # return the square the move starts from
+    return (move & PLAIN) // SQUARES
+
+
+def toSquare(move):
+    # return the square the move ends on
+    return (move & PLAIN) % SQUARES
+
+
+def isCapture(move):
+    # check if the move eats a piece
+    return move & CAPTURE != 0
+
+
+def toString(move):
+    # return the move in the "xy_xnewynew" format, handy when debugging
+    from_, to_ = fromSquare(move), toSquare(move)
+    return str(from_ // SIZE) + str(from_ % SIZE) + "_" + str(to_ // SIZE) + str(to_ % SIZE)
+
+
+def fromString(text):
+    # return the move given in the "xy_xnewynew" format of toString
+    return encode(int(text[0]) * SIZE + int(text[1]), int(text[3]) * SIZE + int(text[4]))
+
+
+def toServerCoordinates(move):
+    # convert the move to the format accepted by the server (columns from a-i and rows from 1-9)
+    from_, to_ = fromSquare(move), toSquare(move)
+    return [chr(from_ % SIZE + 97) + str(from_ // SIZE + 1), chr(to_ % SIZE + 97) + str(to_ // SIZE + 1)]
+
+
+def fromServerCoordinates(from_, to_):
+    # return the move given in the format of the server, e.g. "e4", "e6"
+    return encode((int(from_[1:]) - 1) * SIZE + ord(from_[0]) - 97, (int(to_[1:]) - 1) * SIZE + ord(to_[0]) - 97)
+
+
 class Move():
 
     def __init__(self, from_, to_, turn):
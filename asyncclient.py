@@ -0,0 +1,115 @@
+# Asyncio client for the server: the same game loop as connect2server.connect_to_server, with the network handled by
+# an event loop while the search runs in an executor thread.
+# The frames of the server (a 4-byte big-endian length and a JSON state) are read into a buffer reused for the whole
+# game, and the board is decoded straight from the bytes into the masks of the pieces, without parsing the JSON nor
+# comparing strings: the cells of the board are the quoted words after "board", told apart by their first letter.
+
+import asyncio
+import json
+import re
+import struct
+
+import BitBoard
+import Move as mv
+
+PORTS = {"white": 5800, "black": 5801}
+INITIAL_BUFFER = 4096
+CELL = re.compile(rb'"([A-Z])[A-Z]*"')
+TURN = re.compile(rb'"turn"\s*:\s*"([A-Z]+)"')
+# the turns which end the game
+GAME_OVER = (b"WHITEWIN", b"BLACKWIN", b"DRAW")
+
+
+def decodeState(payload):
+    # return the (white, black, KING, turn) of a state sent by the server
+    start = payload.index(b'"board"')
+    end = payload.index(b"]]", start)
+    white = black = king = 0
+    for sq, cell in enumerate(CELL.findall(payload, start + len(b'"board"'), end)):
+        if cell == b"W":
+            white |= BitBoard.BIT[sq]
+        elif cell == b"B":
+            black |= BitBoard.BIT[sq]
+        elif cell == b"K":
+            king |= BitBoard.BIT[sq]
+    turn = TURN.search(payload)
+    return white, black, king, turn.group(1) if turn else None
+
+
+class StateProtocol(asyncio.BufferedProtocol):
+    # reads the frames of the server into one buffer and queues the decoded states, None when the connection ends
+    def __init__(self):
+        self.buffer = bytearray(INITIAL_BUFFER)
+        self.filled = 0
+        # the size the frame being read needs, the buffer grows to it at the next get_buffer
+        self.needed = 0
+        self.states = asyncio.Queue()
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def get_buffer(self, sizehint):
+        # the free end of the buffer, which grows to the frame being read or doubles when it is full; it is only
+        # resized here, as the transport keeps the view it got until buffer_updated returns
+        size = max(self.needed, 2 * len(self.buffer) if self.filled == len(self.buffer) else len(self.buffer))
+        if size > len(self.buffer):
+            self.buffer.extend(bytes(size - len(self.buffer)))
+        return memoryview(self.buffer)[self.filled:]
+
+    def buffer_updated(self, nbytes):
+        self.filled += nbytes
+        start = 0
+        # decode every complete frame, then move the incomplete one to the front of the buffer
+        while self.filled - start >= 4:
+            length = struct.unpack_from(">i", self.buffer, start)[0]
+            if self.filled - start - 4 < length:
+                self.needed = length + 4
+                break
+            self.states.put_nowait(decodeState(bytes(self.buffer[start + 4:start + 4 + length])))
+            start += 4 + length
+        if start:
+            self.buffer[:self.filled - start] = self.buffer[start:self.filled]
+            self.filled -= start
+
+    def connection_lost(self, exc):
+        self.states.put_nowait(None)
+
+    def send(self, data):
+        # send a frame
+        self.transport.write(struct.pack(">i", len(data)) + data)
+
+
+def moveFrame(move, color):
+    # return the JSON of the move for the server
+    from_, to_ = mv.toServerCoordinates(move)
+    return json.dumps({"from": from_, "to": to_, "turn": color}).encode()
+
+
+async def playGame(player, port=None):
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_connection(StateProtocol, player.server, port or PORTS[player.color])
+    try:
+        protocol.send(player.name.encode())
+        state = "start game" if player.color == "white" else await protocol.states.get()
+        while state is not None:
+            new_state = await protocol.states.get()
+            if new_state is None or new_state[3] in GAME_OVER:
+                break
+            if new_state != state:
+                # the search runs in a thread, the event loop keeps reading from the server
+                move = await loop.run_in_executor(None, player.playBitboards, *new_state[:3])
+                protocol.send(moveFrame(move, player.color))
+                # search on the opponent's time until its move arrives
+                player.ponder()
+                state = await protocol.states.get()
+    finally:
+        transport.close()
+        player.gameOver()
+
+
+def connect_to_server(player, port=None):
+    # play a game on the server, port is the one of the player's color by default
+    if player.color not in PORTS:
+        raise Exception("Se giochi o sei bianco oppure sei nero")
+    asyncio.run(playGame(player, port))
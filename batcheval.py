@@ -0,0 +1,161 @@
+# Batch evaluation of many positions at once: the terms of heuristics.heuristic are computed with NumPy array
+# operations over a whole stack of boards, so that the siblings at the frontier of the search are scored with one call
+# instead of one Python call each. The scores are the same as heuristics.heuristic.
+# The positions are given as an (N, 9, 9) stack of Board arrays or as a list of (white, black, king) bitboards.
+
+import numpy as np
+
+import BitBoard
+import escape
+import heuristics
+
+SQUARES = BitBoard.SQUARES
+# index of the extra cell appended to every position: it is empty, it is not a camp and it stands for "off the board"
+OFF = SQUARES
+
+CAMP = np.array([BitBoard.CAMPS >> sq & 1 for sq in range(SQUARES)] + [0], dtype=bool)
+THRONE = np.zeros(SQUARES + 1, dtype=bool)
+THRONE[BitBoard.THRONE_SQUARE] = True
+EDGE = np.array([BitBoard.EDGES >> sq & 1 for sq in range(SQUARES)], dtype=bool)
+NEAR_THRONE = np.array([BitBoard.NEAR_THRONE >> sq & 1 for sq in range(SQUARES)], dtype=bool)
+NEAR_CAMP = np.array([BitBoard.NEAR_CAMP >> sq & 1 for sq in range(SQUARES)], dtype=bool)
+ON_THRONE = np.arange(SQUARES) == BitBoard.THRONE_SQUARE
+# for every square, the (up, down, left, right) neighbours, OFF for the squares on the edge (where the KING is never
+# surrounded nor captured)
+SIDES = np.array([(sq - 9, sq + 9, sq - 1, sq + 1) if not EDGE[sq] else (OFF,) * 4 for sq in range(SQUARES)])
+# for every square and direction (right, left, down, up), the ray to the edge followed by OFF, always 10 long (the
+# rays are at most 8 long, so the first 9 squares always hold an OFF)
+RAYS = np.full((SQUARES, 4, BitBoard.SIZE + 1), OFF)
+for _sq in range(SQUARES):
+    for _d, _ray in enumerate(BitBoard.RAYS[_sq]):
+        RAYS[_sq, _d, :len(_ray)] = _ray
+# the squares of the rays which stop the sight whatever the position: camps and OFF
+RAY_STOPS = CAMP[RAYS[..., :BitBoard.SIZE]] | (RAYS[..., :BitBoard.SIZE] == OFF)
+_RAY_SQUARES = np.arange(SQUARES)[:, None]
+_RAY_DIRECTIONS = np.arange(4)[None, :]
+# the quadrant masks and, for every square of the KING, the levels of the quadrants used by black_good_moves
+QUADRANTS = np.array([[quadrant >> sq & 1 for quadrant in BitBoard.QUADRANTS] for sq in range(SQUARES)], dtype=float)
+LEVELS = np.array([heuristics.quadrant_levels(sq // 9, sq % 9, BitBoard.CENTER) for sq in range(SQUARES)],
+                  dtype=float)
+_BYTES = (SQUARES + 7) // 8
+
+
+def planesFromArrays(stack):
+    # return the (white, black, king) (N, 81) boolean planes of a stack of Board arrays
+    flat = np.asarray(stack).reshape(len(stack), SQUARES)
+    return flat == 1, flat == 2, flat == 3
+
+
+def planesFromBitboards(boards):
+    # return the (white, black, king) (N, 81) boolean planes of a list of (white, black, king) bitboards
+    planes = []
+    for piece in range(3):
+        data = b"".join(board[piece].to_bytes(_BYTES, "little") for board in boards)
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8).reshape(len(boards), _BYTES), axis=1,
+                             bitorder="little")
+        planes.append(bits[:, :SQUARES].astype(bool))
+    return tuple(planes)
+
+
+def masksFromPlane(plane):
+    # return the bitboards of the (N, 81) plane
+    data = np.packbits(plane, axis=1, bitorder="little")
+    return [int.from_bytes(row.tobytes(), "little") for row in data]
+
+
+def escapeDistances(white, black, king):
+    # return the escape.escapeDistance of every position, computed one by one
+    occupied = masksFromPlane(white | black)
+    squares = king.argmax(axis=1).tolist()
+    return np.array([escape.computeDistance(sq, others) if has_king else escape.NO_ESCAPE
+                     for sq, others, has_king in zip(squares, occupied, king.any(axis=1).tolist())])
+
+
+def extend(plane, off=False):
+    # append the OFF cell to every position
+    return np.concatenate((plane, np.full((len(plane), 1), off)), axis=1)
+
+
+def threatFlags(white, black, king):
+    # return the (white eat, white block, black eat) (N, 81) flags, the same as Board.canWhiteEatFrom & co.
+    occupied = extend(white | black | king)
+    # the first square of every ray which is occupied, a camp or off the board, and the square after it
+    first = (occupied[:, RAYS[..., :BitBoard.SIZE]] | RAY_STOPS).argmax(axis=3)
+    seen = RAYS[_RAY_SQUARES, _RAY_DIRECTIONS, first]
+    after = RAYS[_RAY_SQUARES, _RAY_DIRECTIONS, first + 1]
+    # a camp stops the sight, so the piece seen must not stand on a camp
+    visible = ~CAMP[seen]
+    rows = np.arange(len(white))[:, None, None]
+    white_seen = extend(white)[rows, seen] & visible
+    black_seen = extend(black)[rows, seen] & visible
+    white_anvil = extend(white | king, True) | CAMP | THRONE
+    black_anvil = extend(black, True) | CAMP | THRONE
+    white_eat = white & (black_seen & white_anvil[rows, after]).any(axis=2)
+    white_block = white & black_seen.any(axis=2)
+    black_eat = black & (white_seen & black_anvil[rows, after]).any(axis=2)
+    return white_eat, white_block, black_eat
+
+
+def quadrantWeights():
+    # return the weights of the quadrants for every square of the KING, with the current heuristic weights
+    weights = np.zeros_like(LEVELS)
+    for level, weight in heuristics.LEVEL_WEIGHTS.items():
+        weights[LEVELS == level] = weight
+    return weights
+
+
+def batchHeuristic(white, black, king):
+    # return the heuristics.heuristic score of every position given by its (N, 81) planes
+    weights = heuristics.weights
+    n = len(white)
+    rows = np.arange(n)[:, None]
+    king_square = king.argmax(axis=1)
+    black_ext = extend(black)
+    empty_ext = ~extend(white | black | king)
+    sides = SIDES[king_square]
+    black_sides = black_ext[rows, sides]
+    empty_sides = empty_ext[rows, sides]
+    enemies = black_sides.sum(axis=1)
+    at_edge = EDGE[king_square]
+    score = np.zeros(n)
+    # KING surrounded, near the throne, escaped
+    score += np.where(~at_edge & (enemies > 0), weights["king_surrounded"] * enemies, 0)
+    score -= np.where(NEAR_THRONE[king_square], weights["king_near_throne"], 0)
+    score -= np.where(at_edge, weights["king_escaped"], 0)
+    score -= np.array(heuristics.ESCAPE_SCORES)[escapeDistances(white, black, king)]
+    # KING captured, with the rules of Board.isKingCaptured
+    up, down, left, right = (black_sides[:, i] for i in range(4))
+    up_empty, down_empty, left_empty, right_empty = (empty_sides[:, i] for i in range(4))
+    captured = (ON_THRONE[king_square] & (enemies == 4)) | (NEAR_THRONE[king_square] & (enemies == 3)) | \
+        (NEAR_CAMP[king_square] & (enemies == 1) & ((up & down_empty) | (down & up_empty) | (left & right_empty) |
+                                                    (right & left_empty))) | \
+        ((enemies == 2) & ((up & down) | (left & right)))
+    score += np.where(~at_edge & captured, weights["king_captured"], 0)
+    # pieces balance
+    white_pieces = white.sum(axis=1)
+    black_pieces = black.sum(axis=1)
+    score -= np.where(white_pieces > black_pieces, (white_pieces - black_pieces) * weights["white_extra_piece"], 0)
+    score += np.where(white_pieces < black_pieces, (black_pieces - white_pieces) * weights["black_extra_piece"], 0)
+    # good moves for the BLACK and for the WHITE
+    white_eat, white_block, black_eat = threatFlags(white, black, king)
+    score += (black.astype(float) @ QUADRANTS * quadrantWeights()[king_square]).sum(axis=1) + \
+        black_eat.sum(axis=1) * weights["black_eat"]
+    score -= white_eat.sum(axis=1) * weights["white_eat"] + white_block.sum(axis=1) * weights["white_block"]
+    return score
+
+
+def heuristicFromArrays(stack):
+    # return the scores of an (N, 9, 9) stack of Board arrays
+    return batchHeuristic(*planesFromArrays(stack))
+
+
+def heuristicFromBitboards(boards):
+    # return the scores of a list of (white, black, king) bitboards
+    return batchHeuristic(*planesFromBitboards(boards))
+
+
+def heuristicFromSnapshots(snapshots):
+    # return the scores of a list of board snapshots (see Board.snapshot and BitBoard.snapshot)
+    if isinstance(snapshots[0], np.ndarray):
+        return heuristicFromArrays(np.array(snapshots))
+    return heuristicFromBitboards(snapshots)
@@ -0,0 +1,211 @@
+# Benchmark of the engine on a fixed corpus of positions:
+#   - perft: the number of move sequences of every length up to a depth, checked against the counts below, which also
+#     tests the move generator and makeMove / unmakeMove
+#   - move generation and make / unmake throughput
+#   - heuristic evaluations per second, one by one and with batcheval
+#   - fixed-depth minimax: nodes, nodes per second and time to depth
+# The results are printed as JSON (or written to --output), together with the git commit, so that they can be
+# compared from one commit to the next. Run "python3 benchmark.py --help" for the options.
+
+import argparse
+import json
+import math
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import batcheval
+import escape
+import heuristics
+import tree
+from history import GameHistory
+from timemanager import Deadline
+
+# the positions of the benchmark, row by row ('.' empty, 'W' white, 'B' black, 'K' KING), and the player to move: the
+# initial position and positions reached by random games
+CORPUS = [
+    ("...BBB.../....B..../....W..../B...W...B/BBWWKWWBB/B...W...B/....W..../....B..../...BBB...", "white"),
+    ("...BB..B./....B..../....W..../..W.W...B/BB..KWWBB/B...W...B/....W..../...WB..../...BB...B", "white"),
+    ("...BBB.../....B..../B...W..../..W.....B/BBWWK..BB/...BWW..B/........./B......../....B.W..", "black"),
+    ("....B..B./........./.W.B..B../B...W...B/BB..KW.BB/..W.W..../....W..../...WB..../...BB.W.B", "white"),
+    ("....BB.../........B/.W..W..../...BW...B/BBWWK...B/B..W...B./..W....../.B..B..../....B..BW", "black"),
+    ("...BB.WB./B......../.....W..B/........./B.WWKW..B/.......B./.B....WW./.....B..B/B..BB....", "white"),
+    ("B...B..../..BB...B./W......../...B.W.B./B...KW.../.....WW../W..W.B..W/..B....../B...B..B.", "white"),
+]
+# the perft counts of the corpus positions at depth 1, 2 and 3
+PERFT = [
+    [56, 4392, 247616],
+    [61, 4154, 249530],
+    [71, 3159, 211425],
+    [56, 3651, 199388],
+    [60, 2594, 150400],
+    [50, 2961, 149043],
+    [46, 2511, 112747],
+]
+NAMES = {".": "EMPTY", "W": "WHITE", "B": "BLACK", "K": "KING"}
+
+
+def serverState(position):
+    # return the position as the board sent by the server
+    return [[NAMES[cell] for cell in row] for row in position.split("/")]
+
+
+def loadCorpus():
+    # return the (board, player) pairs of the corpus on the current backend
+    boards = []
+    for position, player in CORPUS:
+        board = tree.backend()
+        board.convertBoard(serverState(position))
+        boards.append((board, player))
+    return boards
+
+
+def opponent(player):
+    return "white" if player == "black" else "black"
+
+
+def perft(board, player, depth):
+    # return the number of move sequences of length depth from the position, the games end when the KING escapes or
+    # is captured
+    if depth == 0:
+        return 1
+    if board.isKingAtEdge() or board.isKingCaptured():
+        return 0
+    count = 0
+    for move in board.generateMoves(board.getBoard(), player):
+        board.makeMove(move)
+        count += perft(board, opponent(player), depth - 1) if depth > 1 else 1
+        board.unmakeMove()
+    return count
+
+
+def benchPerft(corpus, depth):
+    results = []
+    for index, (board, player) in enumerate(corpus):
+        counts = []
+        start = time.perf_counter()
+        for d in range(1, depth + 1):
+            counts.append(perft(board, player, d))
+        seconds = time.perf_counter() - start
+        expected = PERFT[index][:depth] if index < len(PERFT) else None
+        results.append({"position": index, "counts": counts, "ok": expected is None or counts == expected[:len(counts)],
+                        "seconds": seconds})
+    return results
+
+
+def timed(function, seconds):
+    # call function until seconds have passed, return the calls per second
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return calls / elapsed
+
+
+def children(corpus):
+    # return boards holding the positions one move after the corpus positions
+    boards = []
+    for board, player in corpus:
+        for move in board.generateMoves(board.getBoard(), player):
+            board.makeMove(move)
+            child = tree.backend()
+            child.setBoard(board.snapshot())
+            boards.append(child)
+            board.unmakeMove()
+    return boards
+
+
+def benchMoves(corpus, seconds):
+    def generate():
+        for board, player in corpus:
+            board.generateMoves(board.getBoard(), player)
+
+    def makeUnmake():
+        for board, player in corpus:
+            for move in board.generateMoves(board.getBoard(), player):
+                board.makeMove(move)
+                board.unmakeMove()
+    moves = sum(len(board.generateMoves(board.getBoard(), player)) for board, player in corpus)
+    return {"generations_per_second": timed(generate, seconds) * len(corpus),
+            "make_unmake_per_second": timed(makeUnmake, seconds) * moves}
+
+
+def benchEvaluation(corpus, seconds):
+    boards = children(corpus)
+    snapshots = [board.snapshot() for board in boards]
+
+    def evaluate():
+        # the escape distances are cached by position, the cache is emptied so that every call computes them
+        escape._cache.clear()
+        for board in boards:
+            heuristics.heuristic(board, 0)
+    return {"positions": len(boards),
+            "evals_per_second": timed(evaluate, seconds) * len(boards),
+            "batch_evals_per_second": timed(lambda: batcheval.heuristicFromSnapshots(snapshots), seconds) * len(boards)}
+
+
+def benchSearch(corpus, depth):
+    results = []
+    for index, (board, player) in enumerate(corpus):
+        tree.table.clear()
+        tree.newSearch()
+        escape._cache.clear()
+        nodes = tree.stats.nodes
+        start = time.perf_counter()
+        score, move = tree.minimax(board, depth, player, -np.inf, np.inf, GameHistory(), Deadline(math.inf))
+        seconds = time.perf_counter() - start
+        nodes = tree.stats.nodes - nodes
+        results.append({"position": index, "depth": depth, "nodes": nodes, "seconds": seconds,
+                        "nodes_per_second": nodes / seconds, "score": score, "move": move})
+    return results
+
+
+def commit():
+    # return the commit of the working tree, None outside of git
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(backend, perft_depth, search_depth, seconds):
+    tree.setBackend(backend)
+    corpus = loadCorpus()
+    search = benchSearch(corpus, search_depth)
+    nodes = sum(result["nodes"] for result in search)
+    search_seconds = sum(result["seconds"] for result in search)
+    return {"backend": backend,
+            "perft": benchPerft(corpus, perft_depth),
+            "moves": benchMoves(corpus, seconds),
+            "evaluation": benchEvaluation(corpus, seconds),
+            "search": {"positions": search, "nodes": nodes, "seconds": search_seconds,
+                       "nodes_per_second": nodes / search_seconds}}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="benchmark the move generator, the evaluation and the search")
+    parser.add_argument("--backend", choices=sorted(tree.BACKENDS) + ["all"], default="bitboard")
+    parser.add_argument("--perft-depth", type=int, default=2, help="at most 3, the depth of the expected counts")
+    parser.add_argument("--search-depth", type=int, default=3)
+    parser.add_argument("--seconds", type=float, default=1.0, help="length of every throughput run")
+    parser.add_argument("--output", help="JSON file to write, the standard output by default")
+    args = parser.parse_args()
+    backends = sorted(tree.BACKENDS) if args.backend == "all" else [args.backend]
+    report = {"commit": commit(), "python": platform.python_version(), "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+              "results": [run(backend, args.perft_depth, args.search_depth, args.seconds) for backend in backends]}
+    failed = [result["position"] for run_ in report["results"] for result in run_["perft"] if not result["ok"]]
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if failed:
+        sys.exit("perft counts differ from the expected ones for the positions %s" % failed)
@@ -0,0 +1,115 @@
+# Opening book: the best moves of the first positions of the game, searched deeply offline and stored in a binary file
+# of (key, move) records sorted by key, where key is the canonical key of the position with the player to move
+# (symmetry.py, zobrist.searchKey) and move is a packed move (see Move.py) of the canonical image, so the mirror images
+# of a position share its entry.
+# The player maps the file in memory the first time it looks a position up, and finds it with a binary search, so the
+# book costs nothing at startup and a lookup takes a few microseconds.
+#
+# Build it with e.g. "python3 book.py --depth 4 --plies 6 --width 3 book.bin": from the initial position the best moves
+# are searched at depth, and the book follows the width best moves of every position up to plies moves into the game.
+
+import argparse
+import math
+import mmap
+import os
+import time
+
+import numpy as np
+
+import symmetry
+import tree
+import zobrist
+from history import GameHistory
+from timemanager import Deadline
+
+RECORD = np.dtype([("key", "<u8"), ("move", "<u2")])
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+
+class OpeningBook:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.records = None
+
+    def __load(self):
+        # map the file the first time it is needed, a missing book is an empty one
+        self.records = np.zeros(0, dtype=RECORD)
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= RECORD.itemsize:
+            with open(self.path, "rb") as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.records = np.frombuffer(data, dtype=RECORD, count=len(data) // RECORD.itemsize)
+        self.keys = self.records["key"]
+
+    def lookup(self, board, player):
+        # return the book move of the position for the player, None if the position is not in the book
+        if self.records is None:
+            self.__load()
+        key, image = bookKey(board, player)
+        index = int(np.searchsorted(self.keys, np.uint64(key)))
+        if index == len(self.keys) or int(self.keys[index]) != key:
+            return None
+        return symmetry.mapMove(int(self.records["move"][index]), symmetry.INVERSE[image])
+
+
+def bookKey(board, player):
+    # return the key of the position in the book and the symmetry of its canonical image
+    key, image = board.getCanonicalKey()
+    return zobrist.searchKey(key, player), image
+
+
+def write(path, entries):
+    # write the {key: move} entries to the book file
+    records = np.array(sorted(entries.items()), dtype=RECORD)
+    with open(path, "wb") as file:
+        file.write(records.tobytes())
+
+
+def rankMoves(board, player, depth):
+    # return the [(score, move)] of every move of the position searched at depth, the best one first
+    timer = Deadline(math.inf)
+    opponent = "white" if player == "black" else "black"
+    ranked = []
+    for move in board.generateMoves(board.getBoard(), player):
+        board.makeMove(move)
+        try:
+            score, reply = tree.minimax(board, depth - 1, opponent, -np.inf, np.inf, GameHistory(), timer, 1)
+        finally:
+            board.unmakeMove()
+        ranked.append((score, move))
+    ranked.sort(key=lambda entry: entry[0], reverse=player == "black")
+    return ranked
+
+
+def build(board, player, depth, plies, width, entries):
+    # add the best moves of the position and of the positions following its width best moves to entries
+    key, image = bookKey(board, player)
+    if plies == 0 or key in entries:
+        return
+    ranked = rankMoves(board, player, depth)
+    if not ranked:
+        return
+    entries[key] = symmetry.mapMove(ranked[0][1], image)
+    opponent = "white" if player == "black" else "black"
+    for score, move in ranked[:width]:
+        if abs(score) >= tree.WIN_SCORE:
+            continue
+        board.makeMove(move)
+        try:
+            build(board, opponent, depth, plies - 1, width, entries)
+        finally:
+            board.unmakeMove()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="build the opening book")
+    parser.add_argument("path", nargs="?", default=DEFAULT_PATH, help="book file to write")
+    parser.add_argument("--depth", type=int, default=4, help="depth of the search of every position")
+    parser.add_argument("--plies", type=int, default=6, help="moves from the initial position covered by the book")
+    parser.add_argument("--width", type=int, default=3, help="best moves followed in every position")
+    args = parser.parse_args()
+    start = time.time()
+    entries = {}
+    # WHITE moves first
+    build(tree.backend(), "white", args.depth, args.plies, args.width, entries)
+    write(args.path, entries)
+    print("%d positions written to %s in %.1f s" % (len(entries), args.path, time.time() - start))
@@ -17,7 +17,8 @@ def recvall(sock, n):
 
 def receive_current_state(sock):
     len_bytes = struct.unpack('>i', recvall(sock, 4))[0]
-    current_state_server_bytes = sock.recv(len_bytes)
+    # the state may arrive in several pieces
+    current_state_server_bytes = recvall(sock, len_bytes)
     json_current_state_server = json.loads(current_state_server_bytes)
     # get only the board
     current_state = json_current_state_server["board"]
@@ -34,10 +35,12 @@ def convert_move_to_json_for_server(move):
     return json_move
 
 
-def connect_to_server(player):
-    # first connection with the server
+def connect_to_server(player, port=None):
+    # first connection with the server, port is the one of the player's color by default
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-        if player.color == 'white':
+        if port is not None:
+            server_address = (player.server, port)
+        elif player.color == 'white':
             # Connect the socket to the port where the server is listening
             server_address = (player.server, 5800)
         elif player.color == 'black':
@@ -50,20 +53,23 @@ def connect_to_server(player):
         # send player's name to the server
         sock.send(struct.pack('>i', len(player.name)))
         sock.send(player.name.encode())
-        if player.color == 'white':
-            state = "start game"
-        else:
-            state = receive_current_state(sock)
-        while True:
-            new_state = receive_current_state(sock)
-            if new_state != state:
-                # receive move from the player
-                move_list = player.play(new_state)
-                move = mv.Move(move_list[0], move_list[1], player.color)
-                move_for_server = convert_move_to_json_for_server(move)  # convert_move_for_server(move, color)
-                sock.send(struct.pack('>i', len(move_for_server)))
-                sock.send(move_for_server.encode())
+        try:
+            if player.color == 'white':
+                state = "start game"
+            else:
                 state = receive_current_state(sock)
-
-
-
+            while True:
+                new_state = receive_current_state(sock)
+                if new_state != state:
+                    # receive move from the player
+                    move_list = mv.toServerCoordinates(player.play(new_state))
+                    move = mv.Move(move_list[0], move_list[1], player.color)
+                    move_for_server = convert_move_to_json_for_server(move)  # convert_move_for_server(move, color)
+                    sock.send(struct.pack('>i', len(move_for_server)))
+                    sock.send(move_for_server.encode())
+                    # search on the opponent's time until its move arrives
+                    player.ponder()
+                    state = receive_current_state(sock)
+        finally:
+            # the server closes the connection when the game is over
+            player.gameOver()
@@ -0,0 +1,114 @@
+# King escape analysis: how many KING moves the WHITE needs to bring the KING to the edge of the board, with the other
+# pieces standing where they are. The KING slides like a rook over the empty squares and never enters or crosses the
+# camps and the throne, so the squares it reaches are found with occluded fills over the bitboards (BitBoard.py), one
+# fill per direction, and the search for the edge is a breadth-first search over those fills, at most MAX_DISTANCE
+# moves deep.
+# The distances are cached by the Zobrist key of the position, the canonical one when symmetry is enabled (the
+# distance is the same for the 8 images of a position, see symmetry.py).
+
+import BitBoard
+import symmetry
+
+SIZE = BitBoard.SIZE
+ALL = BitBoard.ALL
+BLOCKED = BitBoard.CAMPS | BitBoard.THRONE
+# the farthest distance searched, the KINGs farther away are NO_ESCAPE moves from the edge
+MAX_DISTANCE = 3
+NO_ESCAPE = MAX_DISTANCE + 1
+
+_FIRST_COLUMN = sum(BitBoard.BIT[BitBoard.square(_x, 0)] for _x in range(SIZE))
+_LAST_COLUMN = sum(BitBoard.BIT[BitBoard.square(_x, SIZE - 1)] for _x in range(SIZE))
+_FIRST_ROW = sum(BitBoard.BIT[BitBoard.square(0, _y)] for _y in range(SIZE))
+_LAST_ROW = sum(BitBoard.BIT[BitBoard.square(SIZE - 1, _y)] for _y in range(SIZE))
+# (shift, squares a piece can land on after the shift, edge reached going that way) of the four directions in the
+# order of BitBoard.DIRECTIONS: right, left, down, up; the opposite of direction d is d ^ 1
+SLIDES = ((1, ALL & ~_FIRST_COLUMN, _LAST_COLUMN), (-1, ALL & ~_LAST_COLUMN, _FIRST_COLUMN),
+          (SIZE, ALL, _LAST_ROW), (-SIZE, ALL, _FIRST_ROW))
+
+# the distances already computed, by position key; cleared when it grows too much
+CACHE_SIZE = 1 << 18
+_cache = {}
+
+
+def shift(mask, step):
+    # move every square of mask by step squares
+    return mask << step if step > 0 else mask >> -step
+
+
+def fill(pieces, free, step, landing):
+    # return the pieces plus the free squares they slide over along one direction (Kogge-Stone occluded fill: the
+    # length of the fill doubles at every step, and 1 + 2 + 4 squares plus the last step cover a line of the board)
+    free &= landing
+    for length in (step, 2 * step, 4 * step):
+        pieces |= free & shift(pieces, length)
+        free &= shift(free, length)
+    return pieces
+
+
+def reach(pieces, free):
+    # return the free squares reached in one move by the pieces moving like the KING
+    reached = 0
+    for step, landing, edge in SLIDES:
+        reached |= shift(fill(pieces, free, step, landing), step) & landing
+    return reached & free
+
+
+def openLineSquares(free):
+    # return the squares with an empty line to the edge of the board (see BitBoard.ESCAPE_RAYS): filling back from the
+    # free squares of an edge gives the squares with a free path to it, the squares just before them have the line
+    lines = 0
+    for direction, (step, landing, edge) in enumerate(SLIDES):
+        back, back_landing, back_edge = SLIDES[direction ^ 1]
+        lines |= shift(fill(edge & free, free, back, back_landing), back) & back_landing
+    return lines
+
+
+def computeDistance(king, occupied):
+    # return the number of moves the KING on the king square needs to reach the edge, NO_ESCAPE when it needs more
+    # than MAX_DISTANCE; occupied holds the other pieces
+    position = BitBoard.BIT[king]
+    if position & BitBoard.EDGES:
+        return 0
+    free = ALL & ~(occupied | BLOCKED)
+    lines = openLineSquares(free)
+    if position & lines:
+        return 1
+    seen = frontier = position
+    for distance in range(2, MAX_DISTANCE + 1):
+        frontier = reach(frontier, free) & ~seen
+        if not frontier:
+            break
+        if frontier & lines:
+            return distance
+        seen |= frontier
+    return NO_ESCAPE
+
+
+def escapeDistance(board):
+    # return the escape distance of the KING of the board, NO_ESCAPE without a KING
+    key = board.getCanonicalKey()[0] if symmetry.enabled else board.getKey()
+    distance = _cache.get(key)
+    if distance is None:
+        king = board.getKingSquare()
+        distance = computeDistance(king, board.getOccupied() & ~BitBoard.BIT[king]) if king >= 0 else NO_ESCAPE
+        if len(_cache) >= CACHE_SIZE:
+            _cache.clear()
+        _cache[key] = distance
+    return distance
+
+
+def hasOpenLine(board):
+    # check if the KING has an empty line to the edge, i.e. it can escape with its next move
+    return escapeDistance(board) == 1
+
+
+def forcedEscape(board, player):
+    # check if the WHITE wins by force with the KING's escape: the KING escapes at once when the WHITE is to move, and
+    # when the BLACK is to move a single piece cannot close two open lines, as long as the KING cannot be captured
+    # by the BLACK move (no black piece next to it and no camp to be captured against); a captured KING escapes no more
+    if board.isKingAtEdge() or board.isKingCaptured() or not hasOpenLine(board):
+        return False
+    if player == "white":
+        return True
+    king = board.getKingSquare()
+    return board.openLinesToEdge(king) >= 2 and board.nEnemiesCloseToKing() == 0 and not board.isKingNearCamp()
@@ -1,8 +1,43 @@
 # The engine represents the game algorithm. It is responsible for computing the game tree using the minimax algorithm.
 # After the game tree is computed, the engine will return it to pruning.py to be pruned using alpha-beta pruning.
-import numpy as np
-
 import Board
+import escape
+
+# the weights of the terms of the heuristic, by name; tuner.py fits them and setWeights loads them
+DEFAULT_WEIGHTS = {
+    "king_surrounded": 75,  # per black piece next to the KING
+    "king_near_throne": 10,
+    "king_escaped": 10000,
+    "king_captured": 10000,
+    "white_extra_piece": 2,  # per piece, the BLACK starts with double the pieces of the WHITE
+    "black_extra_piece": 1,
+    "quadrant_best": 1,  # per black piece, see quadrant_weights
+    "quadrant_good": 0.5,
+    "quadrant_poor": 0.25,
+    "black_eat": 0.5,  # per black piece which can eat
+    "white_eat": 2,  # per white piece which can eat
+    "white_block": 1.5,  # per white piece which can block
+    "escape_1": 150,  # KING 1, 2 and 3 moves away from the edge (escape.escapeDistance)
+    "escape_2": 30,
+    "escape_3": 5,
+}
+weights = dict(DEFAULT_WEIGHTS)
+# subtracted from the score for the KING 0, 1, 2, 3 and more moves away from the edge: the KING on the edge has
+# already escaped, see below
+ESCAPE_SCORES = (0, weights["escape_1"], weights["escape_2"], weights["escape_3"], 0)
+# the weights of the levels of quadrant_levels
+LEVEL_WEIGHTS = {1: weights["quadrant_best"], 0.5: weights["quadrant_good"], 0.25: weights["quadrant_poor"]}
+
+
+def setWeights(new_weights):
+    # replace the weights given by name, the others keep their value
+    global ESCAPE_SCORES, LEVEL_WEIGHTS
+    unknown = set(new_weights) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise ValueError("unknown heuristic weights: %s" % ", ".join(sorted(unknown)))
+    weights.update(new_weights)
+    ESCAPE_SCORES = (0, weights["escape_1"], weights["escape_2"], weights["escape_3"], 0)
+    LEVEL_WEIGHTS = {1: weights["quadrant_best"], 0.5: weights["quadrant_good"], 0.25: weights["quadrant_poor"]}
 
 
 # Define the heuristic function
@@ -11,116 +46,104 @@ def heuristic(board, score):
     move_score = score
     # check if the KING is surrounded by the opponent's pieces (not captured)
     if board.isKingSurrounded():
-        move_score += 75*board.nEnemiesCloseToKing()
+        move_score += weights["king_surrounded"]*board.nEnemiesCloseToKing()
     # check if the KING is near the throne in the middle of the board
     if board.isKingNearThrone():
-        move_score -= 10
+        move_score -= weights["king_near_throne"]
     # check if the KING is at the edge of the board (WHITE wins)
     if board.isKingAtEdge():
-        move_score -= 10000
+        move_score -= weights["king_escaped"]
+    # check how many moves the KING needs to reach the edge
+    move_score -= ESCAPE_SCORES[escape.escapeDistance(board)]
     # check if the KING is captured (BLACK wins)
     if board.isKingCaptured():
-        move_score += 10000
+        move_score += weights["king_captured"]
+    white_pieces = board.getWhitePieces()
+    black_pieces = board.getBlackPieces()
     # check if the WHITE has more pieces than the BLACK
-    if board.getWhitePieces() > board.getBlackPieces():
-        move_score -= (board.getWhitePieces() - board.getBlackPieces()) * 2  # multiply by 2 because the BLACK has in the
-        # beginning of the game double the number of pieces than the WHITE
+    if white_pieces > black_pieces:
+        move_score -= (white_pieces - black_pieces) * weights["white_extra_piece"]  # weighted more because the BLACK
+        # has in the beginning of the game double the number of pieces than the WHITE
     # check if the BLACK has more pieces than the WHITE
-    if board.getWhitePieces() < board.getBlackPieces():
-        move_score += (board.getBlackPieces() - board.getWhitePieces())
-    # sum to move score the number of good moves for the BLACK
+    if white_pieces < black_pieces:
+        move_score += (black_pieces - white_pieces) * weights["black_extra_piece"]
+    # sum to move score the good moves for the BLACK
     move_score += black_good_moves(board)
-    # subtract to move score the number of good moves for the WHITE
-    move_score -= white_good_moves(board)*2
+    # subtract to move score the good moves for the WHITE
+    move_score -= white_good_moves(board)
     return move_score
 
 
 def black_good_moves(board):
     # return the number of good moves for the BLACK given the board state
     # every black piece gets assigned a weight score, based on board state, for each quadrant
-    # [top left, top right, bottom left, bottom right]
-    # the weight score is the following:
-    # very good move: 1
-    # good move: 0.5
-    # not so good move: 0.25
+    # [top right, top left, bottom right, bottom left]
+    # the weight score is the following (the default weights):
+    # very good move: 1 (quadrant_best)
+    # good move: 0.5 (quadrant_good)
+    # not so good move: 0.25 (quadrant_poor)
     # then sum all the weighted scores and return the sum
     king = board.getKing()
-    king_x = king[0][0]
-    king_y = king[1][0]
+    weight_score = quadrant_weights(king[0][0], king[1][0], board.getCenterCoordinate())
+    # get the black pieces for each quadrant (the pieces on the middle row and column belong to two quadrants), the
+    # board keeps them up to date
+    top_right_pieces, top_left_pieces, bottom_right_pieces, bottom_left_pieces = board.getBlackQuadrantCounts()
+    # multiply the number of black pieces in each quadrant by the weight score
+    top_right_score = top_right_pieces * weight_score[0]
+    top_left_score = top_left_pieces * weight_score[1]
+    bottom_right_score = bottom_right_pieces * weight_score[2]
+    bottom_left_score = bottom_left_pieces * weight_score[3]
+    # also add for every black piece canBlackEatFrom(x, y)
+    eat_score = board.countBlackEaters()
+    # return the sum of all the weighted scores
+    return top_right_score + top_left_score + bottom_right_score + bottom_left_score + eat_score*weights["black_eat"]
+
+
+def quadrant_weights(king_x, king_y, center):
+    # return the weight score of the black pieces of each quadrant given the position of the KING
+    return [LEVEL_WEIGHTS[level] for level in quadrant_levels(king_x, king_y, center)]
+
+
+def quadrant_levels(king_x, king_y, center):
+    # return the level of the black pieces of each quadrant given the position of the KING: 1 very good, 0.5 good,
+    # 0.25 not so good; in the order of getBlackQuadrantCounts: [top right, top left, bottom right, bottom left]
+    # the quadrant of the KING is very good, the two next to it good and the opposite one not so good, so the 8 images
+    # of a position (see symmetry.py) get the same score
     weight_score = [0.5, 0.5, 0.5, 0.5]
     # if king is in the top left quadrant
-    if king_x < board.getCenterCoordinate() and king_y < board.getCenterCoordinate():
-        weight_score = [1, 0.5, 0.5, 0.25]
-    # if king is in the top right quadrant
-    elif king_x < board.getCenterCoordinate() < king_y:
+    if king_x < center and king_y < center:
         weight_score = [0.5, 1, 0.25, 0.5]
+    # if king is in the top right quadrant
+    elif king_x < center < king_y:
+        weight_score = [1, 0.5, 0.5, 0.25]
     # if king is in the bottom left quadrant
-    elif king_x > board.getCenterCoordinate() > king_y:
-        weight_score = [0.5, 0.25, 1, 0.5]
-    # if king is in the bottom right quadrant
-    elif king_x > board.getCenterCoordinate() and king_y > board.getCenterCoordinate():
+    elif king_x > center > king_y:
         weight_score = [0.25, 0.5, 0.5, 1]
+    # if king is in the bottom right quadrant
+    elif king_x > center and king_y > center:
+        weight_score = [0.5, 0.25, 1, 0.5]
     # if king is in the top middle
-    elif king_x < board.getCenterCoordinate() and king_y == board.getCenterCoordinate():
+    elif king_x < center and king_y == center:
         weight_score = [1, 1, 0.25, 0.25]
     # if king is in the bottom middle
-    elif king_x > board.getCenterCoordinate() and king_y == board.getCenterCoordinate():
+    elif king_x > center and king_y == center:
         weight_score = [0.25, 0.25, 1, 1]
     # if king is in the left middle
-    elif king_x == board.getCenterCoordinate() and king_y < board.getCenterCoordinate():
-        weight_score = [1, 0.25, 1, 0.25]
-    # if king is in the right middle
-    elif king_x == board.getCenterCoordinate() and king_y > board.getCenterCoordinate():
+    elif king_x == center and king_y < center:
         weight_score = [0.25, 1, 0.25, 1]
+    # if king is in the right middle
+    elif king_x == center and king_y > center:
+        weight_score = [1, 0.25, 1, 0.25]
     # if king is in the center
     else:
         weight_score = [0.5, 0.5, 0.5, 0.5]
-    # get the black pieces for each quadrant
-    black_pieces = np.where(board.getBoard() == 2)
-    black_pieces_x = black_pieces[0]
-    black_pieces_y = black_pieces[1]
-    tmp = black_pieces_y[black_pieces_x <= board.getCenterCoordinate()]
-    top_right_pieces = len(tmp[tmp >= board.getCenterCoordinate()])
-    tmp = black_pieces_y[black_pieces_x <= board.getCenterCoordinate()]
-    top_left_pieces = len(tmp[tmp <= board.getCenterCoordinate()])
-    tmp = black_pieces_y[black_pieces_x >= board.getCenterCoordinate()]
-    bottom_right_pieces = len(tmp[tmp >= board.getCenterCoordinate()])
-    tmp = black_pieces_y[black_pieces_x >= board.getCenterCoordinate()]
-    bottom_left_pieces = len(tmp[tmp <= board.getCenterCoordinate()])
-    # multiply the number of black pieces in each quadrant by the weight score
-    top_right_score = top_right_pieces * weight_score[0]
-    top_left_score = top_left_pieces * weight_score[1]
-    bottom_right_score = bottom_right_pieces * weight_score[2]
-    bottom_left_score = bottom_left_pieces * weight_score[3]
-    # also add for every black piece canBlackEatFrom(x, y)
-    eat_score = 0
-    for i in range(len(black_pieces_x)):
-        if board.canBlackEatFrom(black_pieces_x[i], black_pieces_y[i]):
-            eat_score += 1
-    # return the sum of all the weighted scores
-    return top_right_score + top_left_score + bottom_right_score + bottom_left_score + eat_score*0.5
+    return weight_score
 
 
 def white_good_moves(board):
     # return the number of good moves for the WHITE given the board state (see black_good_moves)
     # good moves for white:
     # 1. try to block or eat the black pieces
-    # get the white pieces
-    white_pieces = np.where(board.getBoard() == 1)
-    white_pieces_x = white_pieces[0]
-    white_pieces_y = white_pieces[1]
-    # for each white piece, check if it can eat or block a black piece
-    # if it can, add 1 to the score for kill 0.75 for block
-    score = 0
-    for i in range(len(white_pieces_x)):
-        x = white_pieces_x[i]
-        y = white_pieces_y[i]
-        # check if the piece can eat a black piece
-        if board.canWhiteEatFrom(x, y):
-            score += 1
-        # check if the piece can block a black piece
-        if board.canWhiteBlockFrom(x, y):
-            score += 0.75
-    return score
-
-
+    # for each white piece, check if it can eat or block a black piece (the board keeps these flags up to date)
+    # if it can, add white_eat to the score for kill white_block for block
+    return board.countWhiteEaters() * weights["white_eat"] + board.countWhiteBlockers() * weights["white_block"]
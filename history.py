@@ -0,0 +1,46 @@
+# Game history: the keys of the positions reached in the game and along the path of the search, to find the repeated
+# positions in O(1). A position is repeated when the same pieces stand on the same squares with the same player to
+# move (the key is zobrist.searchKey of the board key); with the Ashton rules a repeated position ends the game in a
+# draw, so the search scores it DRAW_SCORE instead of searching it.
+
+import zobrist
+
+# the score of a repeated position, seen by the BLACK as the heuristic: between the won and the lost games, so the
+# engine repeats a position only when it is behind
+DRAW_SCORE = 0
+
+
+class GameHistory:
+    def __init__(self, keys=()):
+        # how many times every key was reached, in the game and on the search path
+        self.counts = {}
+        # the keys of the game, in the order they were reached
+        self.game = []
+        for key in keys:
+            self.record(key)
+
+    def record(self, key):
+        # add a position reached in the game
+        self.game.append(key)
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def recordBoard(self, board, player):
+        self.record(zobrist.searchKey(board.getKey(), player))
+
+    def push(self, key):
+        # add a position of the search path, taken back by pop
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def pop(self, key):
+        count = self.counts[key] - 1
+        if count:
+            self.counts[key] = count
+        else:
+            del self.counts[key]
+
+    def isRepetition(self, key):
+        return key in self.counts
+
+    def copy(self):
+        # a history of the same game with an empty search path, e.g. for another thread or process
+        return GameHistory(self.game)
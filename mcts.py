@@ -0,0 +1,269 @@
+# Monte Carlo tree search, the engine played with "--engine mcts" instead of the alpha-beta search of tree.py.
+# Every iteration walks down the tree choosing the children by UCT, adds the children of the leaf it reaches, plays a
+# short playout from there with the move generator of the board (captures and KING escapes preferred to random moves)
+# and scores the position it ends in with the heuristic, turned into the chance of a BLACK win by a logistic curve.
+# The search is anytime: it runs until the deadline of the timer and plays the most visited move of the root. The
+# tree is kept from one move to the next and, when the opponent's reply is in it, the search goes on from that node.
+# The nodes live in parallel arrays (NodeStore) with the children of a node next to each other, so that a node is an
+# index and a large tree costs a few tens of bytes per node.
+
+import math
+import random
+from array import array
+
+import BitBoard
+import Move
+import tree
+import zobrist
+from history import GameHistory
+
+# the exploration constant of UCT
+EXPLORATION = 1.4
+# the plies played by a playout before its position is scored by the heuristic
+PLAYOUT_PLIES = 8
+# the heuristic score worth a 73% chance of a BLACK win
+PLAYOUT_SCALE = 100.0
+# the chance that a playout plays a capture, when there is one
+CAPTURE_RATE = 0.8
+# the result of a repeated position, a draw
+DRAW_RESULT = 0.5
+# the most nodes in the store, the leaves are not expanded any more once it is full
+MAX_NODES = 1 << 20
+# the iterations between two looks at the clock
+CHECK_EVERY = 16
+
+
+class NodeStore:
+    # the nodes of the tree in parallel arrays, node 0 is the root: the children of node i are the nodes first[i] to
+    # first[i] + count[i] - 1, first[i] is -1 until the node is expanded. value holds the results of the playouts
+    # through the node, seen by the player who made its move
+    def __init__(self):
+        self.move = array('i')
+        self.first = array('i')
+        self.count = array('i')
+        self.visits = array('i')
+        self.value = array('d')
+
+    def __len__(self):
+        return len(self.move)
+
+    def add(self, move, visits=0, value=0.0):
+        self.move.append(move)
+        self.first.append(-1)
+        self.count.append(0)
+        self.visits.append(visits)
+        self.value.append(value)
+        return len(self.move) - 1
+
+    def expand(self, node, moves):
+        self.first[node] = len(self)
+        self.count[node] = len(moves)
+        for move in moves:
+            self.add(move)
+
+    def children(self, node):
+        first = self.first[node]
+        return range(first, first + self.count[node]) if first >= 0 else range(0)
+
+    def subtree(self, root):
+        # return a new store holding the subtree of root, with root as its root
+        store = NodeStore()
+        store.add(self.move[root], self.visits[root], self.value[root])
+        pending = [(root, 0)]
+        while pending:
+            node, copy = pending.pop()
+            if self.first[node] < 0:
+                continue
+            store.first[copy] = len(store)
+            store.count[copy] = self.count[node]
+            for child in self.children(node):
+                pending.append((child, store.add(self.move[child], self.visits[child], self.value[child])))
+        return store
+
+
+def opponentOf(player):
+    return "white" if player == "black" else "black"
+
+
+def outcome(board):
+    # return the result of a finished game, 1 for a BLACK win and 0 for a WHITE win, None if the game goes on
+    if board.isKingAtEdge():
+        return 0.0
+    if board.isKingCaptured():
+        return 1.0
+    return None
+
+
+class MonteCarloSearch:
+    def __init__(self, seed=None):
+        self.random = random.Random(seed)
+        self.store = NodeStore()
+        self.store.add(0)
+        # the position of the root, to find the opponent's reply in the tree at the next move
+        self.root_snapshot = None
+        self.root_player = None
+        # the longest path walked down the tree by the last search
+        self.depth = 0
+        # the positions of the game, which are draws when the tree reaches them again
+        self.history = GameHistory()
+
+    def reuse(self, board, player):
+        # keep the part of the tree under the position of board: the root itself, or a node two plies below it (our
+        # move and the opponent's reply); otherwise start from an empty tree
+        node = self.findPosition(board, player)
+        if node is None:
+            self.store = NodeStore()
+            self.store.add(0)
+        elif node:
+            self.store = self.store.subtree(node)
+        self.root_snapshot = board.snapshot()
+        self.root_player = player
+
+    def findPosition(self, board, player):
+        if self.root_snapshot is None or self.root_player != player:
+            return None
+        scratch = tree.backend()
+        scratch.setBoard(self.root_snapshot)
+        key = board.getKey()
+        if scratch.getKey() == key:
+            return 0
+        store = self.store
+        for child in store.children(0):
+            scratch.makeMove(store.move[child])
+            for grandchild in store.children(child):
+                scratch.makeMove(store.move[grandchild])
+                found = scratch.getKey() == key
+                scratch.unmakeMove()
+                if found:
+                    return grandchild
+            scratch.unmakeMove()
+        return None
+
+    def search(self, board, player, history, timer, max_iterations=None):
+        # search the position until the timer expires (see tree.timeOut) or max_iterations are done, and return the
+        # (score, move, depth) of the most visited move: the score is the chance of a BLACK win after it, the depth
+        # the longest path of the tree
+        self.reuse(board, player)
+        self.history = history
+        self.depth = 0
+        iterations = 0
+        while max_iterations is None or iterations < max_iterations:
+            if iterations % CHECK_EVERY == 0 and tree.timeOut(timer):
+                break
+            self.iterate(board, player)
+            iterations += 1
+        return self.bestMove(board, player)
+
+    def bestMove(self, board, player):
+        # return the (score, move, depth) of the most visited move of the root, the moves which do not repeat a
+        # position first
+        store = self.store
+        children = [child for child in store.children(0) if store.visits[child]]
+        if not children:
+            return None, board.generateMoves(board.getBoard(), player)[0], 0
+        fresh = []
+        for child in children:
+            board.makeMove(store.move[child])
+            if not self.history.isRepetition(zobrist.searchKey(board.getKey(), opponentOf(player))):
+                fresh.append(child)
+            board.unmakeMove()
+        best = max(fresh or children, key=lambda child: store.visits[child])
+        rate = store.value[best] / store.visits[best]
+        return (rate if player == "black" else 1 - rate), store.move[best], self.depth
+
+    def iterate(self, board, player):
+        # one iteration: selection, expansion, playout and backpropagation
+        store = self.store
+        node = 0
+        path = [0]
+        to_move = player
+        try:
+            result = None
+            while store.first[node] >= 0:
+                if not store.count[node]:
+                    # no moves, the player to move loses
+                    result = 0.0 if to_move == "black" else 1.0
+                    break
+                node = self.select(node)
+                board.makeMove(store.move[node])
+                path.append(node)
+                to_move = opponentOf(to_move)
+                result = self.nodeOutcome(board, to_move)
+                if result is not None:
+                    break
+            # a leaf is expanded at its second visit, and the playout starts from one of its children
+            if result is None and (store.visits[node] or not node) and len(store) < MAX_NODES:
+                moves = board.generateMoves(board.getBoard(), to_move)
+                store.expand(node, tree.orderer.order(board, moves, to_move, len(path) - 1))
+                if moves:
+                    node = self.select(node)
+                    board.makeMove(store.move[node])
+                    path.append(node)
+                    to_move = opponentOf(to_move)
+                    result = self.nodeOutcome(board, to_move)
+            if result is None:
+                result = self.playout(board, to_move)
+        finally:
+            for _ in range(len(path) - 1):
+                board.unmakeMove()
+        self.depth = max(self.depth, len(path) - 1)
+        tree.stats.nodes += 1
+        # the nodes of odd index in the path hold the moves of the player at the root
+        for index, node in enumerate(path):
+            store.visits[node] += 1
+            black_moved = (index % 2 == 1) == (player == "black")
+            store.value[node] += result if black_moved else 1 - result
+
+    def nodeOutcome(self, board, player):
+        # the result of the game at a node of the tree, where the positions of the game reached again are draws
+        if self.history.isRepetition(zobrist.searchKey(board.getKey(), player)):
+            return DRAW_RESULT
+        return outcome(board)
+
+    def select(self, node):
+        # return the child of node with the best UCT score, the children never visited first
+        store = self.store
+        log_visits = math.log(store.visits[node] or 1)
+        best, best_score = -1, -math.inf
+        for child in store.children(node):
+            visits = store.visits[child]
+            if not visits:
+                return child
+            score = store.value[child] / visits + EXPLORATION * math.sqrt(log_visits / visits)
+            if score > best_score:
+                best, best_score = child, score
+        return best
+
+    def playout(self, board, player):
+        # play PLAYOUT_PLIES moves from the position and return the result: the captures are preferred and a KING
+        # which can reach the edge does
+        played = 0
+        try:
+            for _ in range(PLAYOUT_PLIES):
+                result = outcome(board)
+                if result is not None:
+                    return result
+                moves = board.generateMoves(board.getBoard(), player)
+                if not moves:
+                    return 0.0 if player == "black" else 1.0
+                if player == "white":
+                    king = board.getKingSquare()
+                    if any(Move.fromSquare(move) == king and BitBoard.EDGES & BitBoard.BIT[Move.toSquare(move)]
+                           for move in moves):
+                        return 0.0
+                captures = [move for move in moves if move & Move.CAPTURE]
+                if captures and self.random.random() < CAPTURE_RATE:
+                    move = self.random.choice(captures)
+                else:
+                    move = self.random.choice(moves)
+                board.makeMove(move)
+                played += 1
+                player = opponentOf(player)
+            result = outcome(board)
+            if result is not None:
+                return result
+            score = max(-50.0, min(50.0, tree.evaluate(board, 0) / PLAYOUT_SCALE))
+            return 1 / (1 + math.exp(-score))
+        finally:
+            for _ in range(played):
+                board.unmakeMove()
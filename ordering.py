@@ -0,0 +1,75 @@
+# Move ordering for the alpha-beta search: the earlier a good move is searched, the more moves are cut off after it.
+# The moves are tried in this order:
+#   - the best move of an earlier search (from the transposition table or the principal variation)
+#   - the moves eating a piece (flagged by the move generator with the same rules as Board.checkIfEat)
+#   - the KING moves to a square with an empty line to the edge of the board, the ones with more lines first
+#   - the killer moves of the ply: quiet moves which caused a cutoff in a sibling position
+#   - the other moves, by their history score: how often and how deep they caused cutoffs
+
+from array import array
+
+import Move
+
+# the deepest ply with killer moves
+MAX_PLY = 128
+# killer moves kept for every ply
+KILLERS = 2
+
+
+class MoveOrderer:
+    def __init__(self):
+        self.killers = [[0] * KILLERS for ply in range(MAX_PLY)]
+        # history scores by player and move (without flags)
+        self.history = {"white": array('q', [0]) * Move.CAPTURE, "black": array('q', [0]) * Move.CAPTURE}
+
+    def newSearch(self):
+        # called before every move: the killers belong to the previous position, the history is aged
+        for killers in self.killers:
+            killers[:] = [0] * KILLERS
+        for history in self.history.values():
+            for index, value in enumerate(history):
+                if value:
+                    history[index] = value // 4
+
+    def order(self, board, moves, player, ply, first=None):
+        # return the moves in the order they should be searched, first is the best move of an earlier search
+        best, captures, escapes, killer_moves, quiet = [], [], [], [], []
+        killers = self.killers[ply] if ply < MAX_PLY else ()
+        king = -1
+        if player == "white":
+            king_x, king_y = board.getKing()
+            if len(king_x):
+                king = int(king_x[0]) * Move.SIZE + int(king_y[0])
+        for move in moves:
+            if move == first:
+                best.append(move)
+            elif move & Move.CAPTURE:
+                captures.append(move)
+            elif king >= 0 and Move.fromSquare(move) == king:
+                lines = board.openLinesToEdge(Move.toSquare(move), king)
+                if lines:
+                    escapes.append((lines, move))
+                elif move in killers:
+                    killer_moves.append(move)
+                else:
+                    quiet.append(move)
+            elif move in killers:
+                killer_moves.append(move)
+            else:
+                quiet.append(move)
+        history = self.history[player]
+        quiet.sort(key=lambda move: history[move], reverse=True)
+        # two open lines cannot both be closed by the BLACK
+        escapes.sort(key=lambda entry: entry[0], reverse=True)
+        return best + captures + [move for lines, move in escapes] + killer_moves + quiet
+
+    def cutoff(self, move, player, ply, depth):
+        # remember the quiet move which caused a beta cutoff
+        if move & Move.CAPTURE:
+            return
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1:] = killers[:-1]
+                killers[0] = move
+        self.history[player][move] += depth * depth
@@ -0,0 +1,151 @@
+# Parallel search on a pool of processes, by root splitting: every iteration of the iterative deepening shares the
+# moves of the root among the workers, each worker searches its moves with alpha-beta and returns the best one, and the
+# best of the workers is the result of the iteration. The workers live as long as the player, so their transposition
+# tables and move ordering tables stay warm from one iteration (and one move) to the next.
+# Every worker stops at the same deadline as the serial search; with one worker the serial search is used instead.
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import numpy as np
+
+import heuristics
+import symmetry
+import tree
+from timemanager import Deadline
+
+# seconds the player waits for the workers after the deadline before giving an iteration up
+GRACE_SECONDS = 0.2
+
+# seconds a worker waits for the others when the tables are collected
+COLLECT_SECONDS = 10.0
+
+# the search the worker process last worked for, its tables are renewed when a new one starts
+_search_id = None
+# the barrier of the workers, see tableEntries
+_barrier = None
+
+
+def _initWorker(backend_name, tt_mb, weights, symmetric, quiescence, selective, batch_leaves, records, barrier):
+    # set up the search of a worker process, its transposition table starts with the records (see ttstore.py)
+    global _barrier
+    symmetry.enable(symmetric)
+    tree.setBackend(backend_name)
+    tree.setTableSize(tt_mb)
+    tree.setQuiescence(quiescence)
+    tree.setSelective(selective)
+    tree.setBatchLeaves(batch_leaves)
+    heuristics.setWeights(weights)
+    if records is not None and len(records):
+        tree.table.insert(records)
+    _barrier = barrier
+
+
+def tableEntries(min_depth):
+    # return the entries of the transposition table of the worker searched at least min_depth deep; every worker
+    # waits for the others at the barrier, so that each one of them gets one of these tasks
+    _barrier.wait(COLLECT_SECONDS)
+    return tree.table.entries(min_depth)
+
+
+def better(player, score, move, best_score, best_move):
+    # check if (score, move) beats the best one so far for the player
+    if best_move is None:
+        return True
+    return score > best_score if player == "black" else score < best_score
+
+
+def searchMoves(snapshot, player, moves, depth, history, deadline, search_id):
+    # search the moves of the root position at depth and return the (score, move) of the best one, (None, None) if the
+    # deadline came first, and the counters of the search (see telemetry.py); runs in the worker processes
+    global _search_id
+    if search_id != _search_id:
+        tree.newSearch()
+        _search_id = search_id
+    tree.stats.reset()
+    board = tree.backend()
+    board.setBoard(snapshot)
+    timer = Deadline(deadline)
+    opponent = "white" if player == "black" else "black"
+    alpha, beta = -np.inf, np.inf
+    best_score, best_move = None, None
+    try:
+        for move in moves:
+            board.makeMove(move)
+            try:
+                score, reply = tree.minimax(board, depth - 1, opponent, alpha, beta, history, timer, 1)
+            finally:
+                board.unmakeMove()
+            if better(player, score, move, best_score, best_move):
+                best_score, best_move = score, move
+            if player == "black":
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+    except TimeoutError:
+        return None, None, tree.stats.counters()
+    return best_score, best_move, tree.stats.counters()
+
+
+class ParallelSearch:
+    def __init__(self, workers, tt_mb=64, records=None):
+        # records are the entries every worker starts its transposition table with, e.g. read by ttstore.read
+        self.workers = workers
+        self.search_id = 0
+        # the transposition table memory is shared out among the workers
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_initWorker,
+                                            initargs=(tree.backend_name, tt_mb / workers, heuristics.weights,
+                                                      symmetry.enabled, tree.quiescence_search,
+                                                      tree.selective_search, tree.batch_leaves,
+                                                      None if records is None else np.array(records),
+                                                      multiprocessing.Barrier(workers)))
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def entries(self, min_depth=0):
+        # return the entries of the transposition tables of all the workers, as TranspositionTable.entries, so that
+        # ttstore.save can save them
+        futures = [self.executor.submit(tableEntries, min_depth) for _ in range(self.workers)]
+        return np.concatenate([future.result() for future in futures])
+
+    def iterativeDeepening(self, board, player, history, timer, max_depth=tree.MAX_DEPTH):
+        # same as tree.iterativeDeepening, with the root moves of every iteration searched by the workers
+        self.search_id += 1
+        deadline = timer.time + timer.timeout
+        snapshot = board.snapshot()
+        moves = tree.orderer.order(board, board.generateMoves(board.getBoard(), player), player, 0)
+        score, best_move, completed = None, None, 0
+        iterations = []
+        for depth in range(1, max_depth + 1):
+            if completed and not timer.canStartIteration(iterations):
+                break
+            start = time.time()
+            # deal the moves out in turns, so that every worker gets some of the best ones
+            chunks = [moves[worker::self.workers] for worker in range(self.workers)]
+            futures = [self.executor.submit(searchMoves, snapshot, player, chunk, depth, history, deadline,
+                                            self.search_id) for chunk in chunks if chunk]
+            done, pending = wait(futures, timeout=max(0.0, deadline - time.time()) + GRACE_SECONDS)
+            results = [future.result() for future in done]
+            nodes = tree.stats.nodes
+            for result in results:
+                tree.stats.add(result[2])
+            if pending or any(result[1] is None for result in results):
+                break
+            iteration_score, iteration_move = None, None
+            for chunk_score, chunk_move, counters in results:
+                if better(player, chunk_score, chunk_move, iteration_score, iteration_move):
+                    iteration_score, iteration_move = chunk_score, chunk_move
+            score, best_move, completed = iteration_score, iteration_move, depth
+            iterations.append((tree.stats.nodes - nodes, time.time() - start))
+            tree.stats.iteration(depth, *iterations[-1])
+            # the next iteration starts from the best move of every worker, the best one first
+            winners = sorted(results, key=lambda result: result[0], reverse=player == "black")
+            firsts = [move for result_score, move, counters in winners]
+            moves = firsts + [move for move in moves if move not in firsts]
+            if abs(score) >= tree.WIN_SCORE:
+                break
+        if best_move is None:
+            best_move = moves[0]
+        return score, best_move, completed
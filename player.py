@@ -1,60 +1,188 @@
-import time
-
 import connect2server as cns
-import Board
+import asyncclient
 import tree
-import numpy as np
-import sys
-
-# timer class
-class Timer:
-    def __init__(self, timeout):
-        self.timeout = int(timeout) - 15
-        self.time = 0
+import Move
+import parallel
+import ponder
+import book
+import ttstore
+import telemetry
+import heuristics
+import symmetry
+import zobrist
+import mcts
+import json
+import argparse
+from history import GameHistory
+from timemanager import TimeManager
 
 
 # create Player class
 class Player:
-    def __init__(self, name, color, server, timer):
+    def __init__(self, name, color, server, timer, workers=1, tt_mb=64, pondering=False,
+                 book_path=book.DEFAULT_PATH, tt_file=None, telemetry_target=None, engine="alphabeta"):
         self.name = name
         self.color = color
+        self.opponent = "white" if color == "black" else "black"
         self.server = server
-        self.board = Board.Board()
-        self.move = []
+        self.board = tree.backend()
+        # the positions of the game, a position reached again is a draw
+        self.history = GameHistory()
         self.timer = timer
+        # the Monte Carlo tree search replaces the alpha-beta search, its tree is kept from one move to the next
+        self.mcts = mcts.MonteCarloSearch() if engine == "mcts" else None
+        # the results of the searches of the earlier games, loaded into the tables which are searched
+        self.tt_file = tt_file
+        # with more than one worker the search runs on a pool of processes
+        self.parallel = None
+        if workers > 1 and self.mcts is None:
+            self.parallel = parallel.ParallelSearch(workers, tt_mb, ttstore.read(tt_file) if tt_file else None)
+            # the workers have the transposition tables, the one of the player is never searched
+            tree.setTableSize(0)
+        elif tt_file:
+            ttstore.load(tree.table, tt_file)
+        # search on the opponent's time, on the transposition table of the player: not with the workers
+        self.ponderer = ponder.Ponderer() if pondering and self.mcts is None and self.parallel is None else None
+        self.last_move = None
+        # the book file is only opened at its first lookup
+        self.book = book.OpeningBook(book_path) if book_path else None
+        # where the report of every move is sent
+        self.telemetry = telemetry.Emitter(telemetry_target) if telemetry_target else None
 
     def play(self, current_state):
         # receive the current state from the server
         # update the board
-        self.timer.time = time.time()
+        self.timer.start()
         self.board.convertBoard(current_state)
-        # generate the tree
-        depth = 3
+        return self.search()
+
+    def playBitboards(self, white, black, king):
+        # same as play, with the state already decoded to the masks of the pieces (see asyncclient.py)
+        self.timer.start()
+        self.board.setBitboards(white, black, king)
+        return self.search()
+
+    def search(self):
+        # return the move to play in the position of the board
+        pondered = self.ponderer.stop() if self.ponderer is not None else None
+        ponder_hit = pondered is not None and pondered[:2] == (self.board.getKey(), self.color)
+        if not ponder_hit:
+            # the tables of the pondering belong to this very search, otherwise they are aged
+            tree.newSearch()
+        tree.stats.reset()
+        self.history.recordBoard(self.board, self.color)
+        minEval, depth = None, 0
+        move = self.bookMove()
+        from_book = move is not None
+        if not from_book:
+            # search deeper and deeper until the time manager stops
+            if self.mcts is not None:
+                minEval, move, depth = self.mcts.search(self.board, self.color, self.history, self.timer)
+            elif self.parallel is not None:
+                minEval, move, depth = self.parallel.iterativeDeepening(self.board, self.color, self.history,
+                                                                        self.timer)
+            else:
+                minEval, move, depth = tree.iterativeDeepening(self.board, self.color, self.history, self.timer)
+            if ponder_hit and pondered[2] is not None and pondered[2][2] > depth:
+                # the opponent played the predicted move and the pondering went deeper
+                minEval, move, depth = pondered[2]
+        # remember the position after the move, the move is converted for the server by connect2server
+        self.board.makeMove(move)
+        self.history.recordBoard(self.board, self.opponent)
+        self.board.unmakeMove()
+        self.last_move = move
+        if self.telemetry is not None:
+            self.telemetry.emit(dict(tree.stats.report(), player=self.color, move=Move.toString(move), score=minEval,
+                                     depth=depth, book=from_book, ponder_hit=ponder_hit,
+                                     seconds=self.timer.elapsed()))
+        return move
+
+    def bookMove(self):
+        # return the move of the opening book for the position, if it is legal and does not repeat a position
+        if self.book is None:
+            return None
+        move = self.book.lookup(self.board, self.color)
+        if move is None or move not in self.board.generateMoves(self.board.getBoard(), self.color):
+            return None
+        self.board.makeMove(move)
+        repeated = self.history.isRepetition(zobrist.searchKey(self.board.getKey(), self.opponent))
+        self.board.unmakeMove()
+        return None if repeated else move
+
+    def gameOver(self):
+        # called when the connection with the server ends
+        if self.ponderer is not None:
+            self.ponderer.stop()
+        if self.tt_file:
+            # the tables of the workers when they searched
+            ttstore.save(tree.table if self.parallel is None else self.parallel, self.tt_file)
+        if self.parallel is not None:
+            self.parallel.close()
+        if self.telemetry is not None:
+            self.telemetry.close()
+
+    def ponder(self):
+        # called once the move is sent to the server: think while the opponent does
+        if self.ponderer is None or self.last_move is None:
+            return
+        self.board.makeMove(self.last_move)
         try:
-            minEval, move = tree.minimax(self.board.getBoard(), depth, self.color, -np.inf, np.inf, self.move, self.timer)
-        except TimeoutError:
-            self.timer.time = time.time()
-            depth -= 2
-            minEval, move = tree.minimax(self.board.getBoard(), depth, self.color, -np.inf, np.inf, self.move, self.timer)
-        # convert the move to the format accepted by the server (rows from a-h and columns from 1-9)
-        if len(self.move) == 5:
-            # remove the first element of the list
-            self.move.pop(0)
-            # add the current move to the list
-            self.move.append(move)
-        else:
-            self.move.append(move)
-        x1 = move[0]
-        y1 = move[1]
-        x2 = move[3]
-        y2 = move[4]
-        converted_move = [chr(int(y1) + 97) + str(int(x1) + 1), chr(int(y2) + 97) + str(int(x2) + 1)]
-        return converted_move
-
-
-color = sys.argv[1]
-timeout = sys.argv[2]
-server_ip = sys.argv[3]
-timer = Timer(timeout)
-player = Player("MALI", color.lower(), server_ip, timer)
-cns.connect_to_server(player)
+            self.ponderer.start(self.board, self.color, self.history)
+        finally:
+            self.board.unmakeMove()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("color", help="white or black")
+    parser.add_argument("timeout", help="seconds available for every move")
+    parser.add_argument("server_ip", help="ip address of the server")
+    parser.add_argument("--backend", choices=sorted(tree.BACKENDS), default="bitboard",
+                        help="board representation used by the search")
+    parser.add_argument("--tt-mb", type=float, default=64, help="size of the transposition table in MB")
+    parser.add_argument("--batch-leaves", action="store_true",
+                        help="score the children of the depth 1 nodes with one NumPy call (faster on the numpy backend, "
+                             "used only with --no-quiescence)")
+    parser.add_argument("--workers", type=int, default=1, help="processes searching in parallel")
+    parser.add_argument("--ponder", action="store_true",
+                        help="keep searching while the opponent thinks (not with --workers)")
+    parser.add_argument("--book", default=book.DEFAULT_PATH, help="opening book file (see book.py), \"\" for none")
+    parser.add_argument("--tt-file", help="file keeping the deep search results from one game to the next")
+    parser.add_argument("--telemetry", help="file, udp://host:port or tcp://host:port receiving a JSON line per move")
+    parser.add_argument("--port", type=int, help="port of the server, 5800 for the WHITE and 5801 for the BLACK by default")
+    parser.add_argument("--client", choices=["async", "sync"], default="async",
+                        help="asyncio client (asyncclient.py) or the original blocking one (connect2server.py)")
+    parser.add_argument("--symmetry", action="store_true",
+                        help="store the mirror images of a position once in the transposition table")
+    parser.add_argument("--weights", help="JSON file of heuristic weights, e.g. a checkpoint of tuner.py")
+    parser.add_argument("--no-quiescence", action="store_true",
+                        help="evaluate the positions at the horizon at once, without playing out the captures")
+    parser.add_argument("--engine", choices=["alphabeta", "mcts"], default="alphabeta",
+                        help="alpha-beta search (tree.py) or Monte Carlo tree search (mcts.py, without --workers and "
+                             "--ponder)")
+    parser.add_argument("--no-selective", action="store_true",
+                        help="search every move at full depth, without late move reductions and futility pruning")
+    args = parser.parse_args()
+    if args.ponder and args.workers > 1 and args.engine == "alphabeta":
+        # the pondering searches the table of the player, the workers never read it
+        parser.error("--ponder cannot be used with --workers")
+    color = args.color
+    timeout = args.timeout
+    server_ip = args.server_ip
+    symmetry.enable(args.symmetry)
+    tree.setBackend(args.backend)
+    tree.setTableSize(args.tt_mb)
+    tree.setBatchLeaves(args.batch_leaves)
+    tree.setQuiescence(not args.no_quiescence)
+    tree.setSelective(not args.no_selective)
+    if args.weights:
+        with open(args.weights) as file:
+            weights = json.load(file)
+        heuristics.setWeights(weights.get("weights", weights))
+    timer = TimeManager(timeout)
+    player = Player("MALI", color.lower(), server_ip, timer, args.workers, args.tt_mb, args.ponder,
+                    args.book, args.tt_file, args.telemetry, args.engine)
+    if args.client == "async":
+        asyncclient.connect_to_server(player, args.port)
+    else:
+        cns.connect_to_server(player, args.port)
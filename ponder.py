@@ -0,0 +1,76 @@
+# Pondering: while the opponent thinks the engine keeps searching in a background thread. After our move the reply
+# predicted by the principal variation is played on a copy of the board and the search goes on from there, as if it
+# were already our turn; without a prediction the position after our move is searched from the opponent's side, which
+# fills the transposition table and the history with all the replies.
+# When the real state arrives the pondering stops: if the opponent played the predicted reply the search of the player
+# starts from a warm transposition table, and the pondered move is played if it was searched deeper.
+
+import math
+import threading
+import time
+
+import tree
+
+
+class PonderTimer:
+    # a timer for tree.timeOut and iterativeDeepening without a deadline, which expires as soon as stop is called
+    def __init__(self):
+        self.time = time.time()
+        self.stopped = threading.Event()
+
+    @property
+    def timeout(self):
+        return -1 if self.stopped.is_set() else math.inf
+
+    def stop(self):
+        self.stopped.set()
+
+    def canStartIteration(self, iterations):
+        return not self.stopped.is_set()
+
+
+class Ponderer:
+    def __init__(self):
+        self.thread = None
+        self.timer = None
+        # (key, player, (score, move, depth)) of the pondered position, the result is set by the thread
+        self.key = None
+        self.player = None
+        self.result = None
+
+    def start(self, board, player, history):
+        # start pondering on the position after our move, player is the color of the engine
+        self.stop()
+        board = copyBoard(board)
+        opponent = "white" if player == "black" else "black"
+        tree.newSearch()
+        prediction = tree.principalVariation(board, opponent, 1)
+        if prediction:
+            board.makeMove(prediction[0])
+        else:
+            player = opponent
+        self.key, self.player, self.result = board.getKey(), player, None
+        self.timer = PonderTimer()
+        self.thread = threading.Thread(target=self.__search, args=(board, player, history.copy(), self.timer),
+                                       daemon=True)
+        self.thread.start()
+
+    def __search(self, board, player, history, timer):
+        self.result = tree.iterativeDeepening(board, player, history, timer)
+
+    def stop(self):
+        # stop the thread and return the (key, player, (score, move, depth)) of the pondered position, None when
+        # nothing was pondered
+        if self.thread is None:
+            return None
+        self.timer.stop()
+        self.thread.join()
+        self.thread = None
+        return self.key, self.player, self.result
+
+
+def copyBoard(board):
+    # a board of the search backend holding the same position as board
+    copy = tree.backend()
+    copy.setBoard(board.snapshot())
+    return copy
@@ -0,0 +1,201 @@
+# Local referee: a Tablut server speaking the protocol of the tournament server (see connect2server.py), to test the
+# player without the Java server. The WHITE connects to port, the BLACK to port + 1; both send their name, then the
+# referee sends them the state after every move, as a 4-byte big-endian length and a JSON {"board", "turn"}, and
+# waits for the move of the player to move as {"from", "to", "turn"}.
+# The moves are checked with the rules of the engine (Ashton's rules, see BitBoard.generateFromBitboards) but played
+# by playMove, which eats every sandwiched pawn where the engine eats only the first one, and a player loses the game by playing an illegal move, by not moving within the timeout or by having no move. The KING
+# escaping to the edge wins for the WHITE, the KING captured wins for the BLACK (see kingCaptured), and a position
+# repeated or a game longer than max_plies is a draw.
+#
+# Run it with e.g. "python3 referee.py --port 5800 --timeout 60", or from selfplay.py.
+
+import argparse
+import asyncio
+import json
+import struct
+import time
+
+import BitBoard
+import Move
+
+NAMES = {BitBoard.WHITE: "WHITE", BitBoard.BLACK: "BLACK", BitBoard.KING: "KING"}
+# seconds a player is given on top of the timeout, for the network
+GRACE_SECONDS = 1.0
+MAX_PLIES = 500
+
+
+def stateOf(board, turn):
+    # return the JSON state sent to the players
+    cells = [["EMPTY"] * BitBoard.SIZE for x in range(BitBoard.SIZE)]
+    cells[BitBoard.CENTER][BitBoard.CENTER] = "THRONE"
+    for value, mask in zip((BitBoard.WHITE, BitBoard.BLACK, BitBoard.KING), board.getBoard()):
+        for sq in BitBoard.squaresOf(mask):
+            x, y = BitBoard.coordinates(sq)
+            cells[x][y] = NAMES[value]
+    return json.dumps({"board": cells, "turn": turn}).encode()
+
+
+def kingCaptured(board, moved_to):
+    # check if the BLACK piece which moved to moved_to captured the KING, with Ashton's rules: on the throne the KING
+    # is surrounded on four sides, next to the throne on the other three, elsewhere it is sandwiched like a pawn between
+    # the piece which moved and a black piece or a camp on the opposite side
+    king = board.getKingSquare()
+    white, black, king_mask = board.getBoard()
+    if king < 0 or not BitBoard.NEIGHBOUR_MASKS[king] & BitBoard.BIT[moved_to]:
+        return False
+    if king == BitBoard.THRONE_SQUARE or king_mask & BitBoard.NEAR_THRONE:
+        return BitBoard.NEIGHBOUR_MASKS[king] & ~black & ~BitBoard.THRONE == 0
+    beyond = 2 * king - moved_to
+    return 0 <= beyond < BitBoard.SQUARES and beyond in BitBoard.NEIGHBOURS[king] and \
+        (black | BitBoard.CAMPS) & BitBoard.BIT[beyond] != 0
+
+
+def eatenSquares(to_, prey, anvil):
+    # return the prey squares eaten by a piece moving to to_: with Ashton's rules a move eats every pawn sandwiched
+    # between to_ and the anvil, up to three of them, where BitBoard.eatenSquare stops at the first one
+    return [neighbour for neighbour, beyond in BitBoard.CAPTURE_PAIRS[to_]
+            if prey & BitBoard.BIT[neighbour] and beyond != -1 and anvil & BitBoard.BIT[beyond]]
+
+
+def playMove(board, move):
+    # play the move on the board with Ashton's rules, return the eaten squares; the position is set again with
+    # setBoard, so the move cannot be taken back
+    white, black, king = board.getBoard()
+    origin = BitBoard.BIT[Move.fromSquare(move)]
+    to_ = Move.toSquare(move)
+    moving = origin | BitBoard.BIT[to_]
+    if white & origin:
+        white ^= moving
+        eaten = eatenSquares(to_, black, white | king | BitBoard.CAMPS | BitBoard.THRONE)
+        for sq in eaten:
+            black ^= BitBoard.BIT[sq]
+    elif black & origin:
+        black ^= moving
+        eaten = eatenSquares(to_, white, black | BitBoard.CAMPS | BitBoard.THRONE)
+        for sq in eaten:
+            white ^= BitBoard.BIT[sq]
+    else:
+        # the KING does not eat
+        king ^= moving
+        eaten = []
+    board.setBoard((white, black, king))
+    return eaten
+
+
+async def readFrame(reader):
+    length = struct.unpack(">i", await reader.readexactly(4))[0]
+    return await reader.readexactly(length)
+
+
+def sendFrame(writer, data):
+    writer.write(struct.pack(">i", len(data)) + data)
+
+
+class Referee:
+    def __init__(self, port=5800, timeout=60, host="127.0.0.1", max_plies=MAX_PLIES):
+        self.port = port
+        self.timeout = timeout
+        self.host = host
+        self.max_plies = max_plies
+
+    async def playGame(self, ready=None):
+        # wait for the two players and referee a game between them, return its result; the ready event is set when
+        # the players can connect
+        connections = {}
+        both = asyncio.Event()
+
+        async def connected(color, reader, writer):
+            connections[color] = (reader, writer)
+            if len(connections) == 2:
+                both.set()
+
+        servers = [await asyncio.start_server(lambda reader, writer, color=color: connected(color, reader, writer),
+                                              self.host, self.port + offset)
+                   for offset, color in enumerate(("white", "black"))]
+        if ready is not None:
+            ready.set()
+        try:
+            await both.wait()
+            names = {color: (await readFrame(reader)).decode(errors="replace")
+                     for color, (reader, writer) in connections.items()}
+            result = await self.referee(connections)
+            result["names"] = names
+            return result
+        finally:
+            for server in servers:
+                server.close()
+            for reader, writer in connections.values():
+                writer.close()
+
+    async def referee(self, connections):
+        board = BitBoard.BitBoard()
+        player, turn = "white", "WHITE"
+        seen = {(board.getKey(), player)}
+        times = {"white": [], "black": []}
+        moves_played = []
+        result = None
+        while result is None:
+            state = stateOf(board, turn)
+            for reader, writer in connections.values():
+                sendFrame(writer, state)
+            moves = board.generateMoves(board.getBoard(), player)
+            if not moves:
+                result = self.end(player, "no moves")
+                break
+            reader, writer = connections[player]
+            start = time.time()
+            try:
+                data = json.loads(await asyncio.wait_for(readFrame(reader), self.timeout + GRACE_SECONDS))
+                move = Move.fromServerCoordinates(data["from"], data["to"])
+            except asyncio.TimeoutError:
+                result = self.end(player, "timeout")
+                break
+            except (asyncio.IncompleteReadError, ConnectionError, ValueError, KeyError, IndexError):
+                result = self.end(player, "disconnected or bad message")
+                break
+            times[player].append(time.time() - start)
+            legal = {plain & Move.PLAIN: plain for plain in moves}
+            if move not in legal:
+                result = self.end(player, "illegal move " + Move.toString(move))
+                break
+            playMove(board, move)
+            moves_played.append(Move.toString(move))
+            moved = player
+            player = "black" if player == "white" else "white"
+            if moved == "white" and board.isKingAtEdge():
+                result = {"winner": "white", "reason": "escape", "turn": "WHITEWIN"}
+            elif moved == "black" and kingCaptured(board, Move.toSquare(move)):
+                result = {"winner": "black", "reason": "capture", "turn": "BLACKWIN"}
+            elif (board.getKey(), player) in seen:
+                result = {"winner": None, "reason": "repetition", "turn": "DRAW"}
+            elif len(times["white"]) + len(times["black"]) >= self.max_plies:
+                result = {"winner": None, "reason": "too long", "turn": "DRAW"}
+            seen.add((board.getKey(), player))
+            turn = player.upper()
+        # the final state tells the players the game is over
+        state = stateOf(board, result["turn"])
+        for reader, writer in connections.values():
+            sendFrame(writer, state)
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+        result["plies"] = len(times["white"]) + len(times["black"])
+        result["times"] = times
+        result["moves"] = moves_played
+        return result
+
+    def end(self, loser, reason):
+        # the result of a game lost by loser
+        winner = "black" if loser == "white" else "white"
+        return {"winner": winner, "reason": "%s by %s" % (reason, loser), "turn": winner.upper() + "WIN"}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="local Tablut server")
+    parser.add_argument("--port", type=int, default=5800, help="port of the WHITE, the BLACK connects to port + 1")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds per move")
+    parser.add_argument("--games", type=int, default=1, help="games to referee one after the other")
+    args = parser.parse_args()
+    for game in range(args.games):
+        print(json.dumps(asyncio.run(Referee(args.port, args.timeout).playGame())))
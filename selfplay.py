@@ -0,0 +1,101 @@
+# Headless self-play: plays games between two engines on the local referee (referee.py), several games at once, and
+# writes the result of every game as a JSON line: winner, reason, length and move times. Every engine is a player.py
+# command line, e.g. --a "player.py" --b "../other_checkout/player.py --backend numpy", and the engines swap colors
+# from one game to the next. The summary of the match is printed at the end.
+#
+# Run it with e.g. "python3 selfplay.py --games 100 --concurrency 4 --timeout 5 --output games.jsonl".
+
+import argparse
+import asyncio
+import json
+import os
+import shlex
+import sys
+
+from referee import Referee
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def engineCommand(engine, color, timeout, port):
+    # return the command line of the player of an engine
+    words = shlex.split(engine)
+    path = words[0] if os.path.isabs(words[0]) else os.path.join(HERE, words[0])
+    return [sys.executable, path, color, str(timeout), "127.0.0.1", "--port", str(port)] + words[1:]
+
+
+async def playOne(index, engines, timeout, port, verbose):
+    # play game index on the ports port and port + 1, the engines swap colors at every game
+    white, black = ("a", "b") if index % 2 == 0 else ("b", "a")
+    referee = Referee(port, timeout)
+    ready = asyncio.Event()
+    game = asyncio.create_task(referee.playGame(ready))
+    await ready.wait()
+    output = None if verbose else asyncio.subprocess.DEVNULL
+    players = [await asyncio.create_subprocess_exec(*engineCommand(engines[label], color, timeout, port + offset),
+                                                    stdout=output, stderr=output)
+               for offset, (label, color) in enumerate(((white, "white"), (black, "black")))]
+    try:
+        result = await game
+    finally:
+        for process in players:
+            try:
+                await asyncio.wait_for(process.wait(), timeout + 5)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+    times = result.pop("times")
+    result.update(game=index, white=white, black=black,
+                  winner_engine={"white": white, "black": black}.get(result["winner"]),
+                  white_mean_time=sum(times["white"]) / max(1, len(times["white"])),
+                  black_mean_time=sum(times["black"]) / max(1, len(times["black"])),
+                  white_max_time=max(times["white"], default=0), black_max_time=max(times["black"], default=0))
+    return result
+
+
+async def playMatch(args, output):
+    engines = {"a": args.a, "b": args.b}
+    # every slot plays its games one after the other on its own pair of ports
+    slots = asyncio.Queue()
+    for slot in range(args.concurrency):
+        slots.put_nowait(args.port + 2 * slot)
+    results = []
+
+    async def run(index):
+        port = await slots.get()
+        try:
+            result = await playOne(index, engines, args.timeout, port, args.verbose)
+        finally:
+            slots.put_nowait(port)
+        results.append(result)
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+    await asyncio.gather(*(run(index) for index in range(args.games)))
+    return results
+
+
+def summary(results):
+    plies = [result["plies"] for result in results]
+    return {"games": len(results),
+            "a_wins": sum(result["winner_engine"] == "a" for result in results),
+            "b_wins": sum(result["winner_engine"] == "b" for result in results),
+            "draws": sum(result["winner"] is None for result in results),
+            "white_wins": sum(result["winner"] == "white" for result in results),
+            "mean_plies": sum(plies) / max(1, len(plies))}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="play games between two engines on the local referee")
+    parser.add_argument("--a", default="player.py", help="command line of the first engine")
+    parser.add_argument("--b", default="player.py", help="command line of the second engine")
+    parser.add_argument("--games", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="games played at the same time")
+    parser.add_argument("--timeout", type=float, default=5, help="seconds per move")
+    parser.add_argument("--port", type=int, default=6800, help="first port used by the referees")
+    parser.add_argument("--output", help="JSON lines file of the games, the standard output by default")
+    parser.add_argument("--verbose", action="store_true", help="show the output of the players")
+    args = parser.parse_args()
+    output = open(args.output, "a") if args.output else sys.stdout
+    results = asyncio.run(playMatch(args, output))
+    print(json.dumps(summary(results)), file=sys.stderr)
@@ -0,0 +1,69 @@
+# The 8 symmetries of the board (the rotations and reflections of the square, which keep the camps and the throne
+# where they are): a position and its mirror images have the same score and mirrored best moves, so the
+# transposition table, the opening book and the escape cache can store them once, under the canonical key of the
+# position, the smallest of the Zobrist keys of its 8 images.
+# A symmetry is a permutation of the squares: PERMUTATIONS[t][sq] is the image of sq under the symmetry t. The keys
+# of the images are kept up to date by the boards as the moves are made (see BitBoard.makeMove) when enabled.
+
+import Move
+import zobrist
+
+SIZE = 9
+SQUARES = SIZE * SIZE
+_LAST = SIZE - 1
+# identity, the three rotations, the two reflections on the middle lines and the two on the diagonals
+_TRANSFORMS = (lambda x, y: (x, y), lambda x, y: (y, _LAST - x), lambda x, y: (_LAST - x, _LAST - y),
+               lambda x, y: (_LAST - y, x), lambda x, y: (_LAST - x, y), lambda x, y: (x, _LAST - y),
+               lambda x, y: (y, x), lambda x, y: (_LAST - y, _LAST - x))
+PERMUTATIONS = tuple(tuple(_transform(sq // SIZE, sq % SIZE)[0] * SIZE + _transform(sq // SIZE, sq % SIZE)[1]
+                           for sq in range(SQUARES)) for _transform in _TRANSFORMS)
+IDENTITY = 0
+# INVERSE[t] undoes the symmetry t
+INVERSE = tuple(next(u for u in range(8) if all(PERMUTATIONS[u][PERMUTATIONS[t][sq]] == sq for sq in range(SQUARES)))
+                for t in range(8))
+# KEYS[t][piece][sq] is the Zobrist key of the piece on the image of sq under the symmetry t
+KEYS = tuple(tuple(tuple(zobrist.KEYS[piece][PERMUTATIONS[t][sq]] for sq in range(SQUARES)) for piece in range(4))
+             for t in range(8))
+# the moves of every symmetry, MOVES[t][move] for the moves without flags
+MOVES = tuple(tuple(Move.encode(PERMUTATIONS[t][move // SQUARES], PERMUTATIONS[t][move % SQUARES])
+                    for move in range(SQUARES * SQUARES)) for t in range(8))
+
+# when True the boards keep the keys of the 8 images and the search uses canonical keys
+enabled = False
+
+
+def enable(flag):
+    # turn the canonical keys on or off, for the boards set up afterwards
+    global enabled
+    enabled = flag
+
+
+def keysOf(squares):
+    # return the keys of the 8 images of the position given as an iterable of (piece, square) pairs
+    keys = [0] * 8
+    for piece, sq in squares:
+        for t in range(8):
+            keys[t] ^= KEYS[t][piece][sq]
+    return keys
+
+
+def moveKeys(keys, piece, from_, to_, prey, captured):
+    # update the keys of the 8 images for the piece moving from from_ to to_ and eating the prey on the captured
+    # squares; the same call takes the move back
+    for t in range(8):
+        table = KEYS[t]
+        key = keys[t] ^ table[piece][from_] ^ table[piece][to_]
+        for sq in captured:
+            key ^= table[prey][sq]
+        keys[t] = key
+
+
+def canonical(keys):
+    # return (key, t): the canonical key among the keys of the 8 images and the symmetry t giving it
+    key = min(keys)
+    return key, keys.index(key)
+
+
+def mapMove(move, t):
+    # return the image of the move under the symmetry t, with its flags
+    return MOVES[t][move & Move.PLAIN] | (move & ~Move.PLAIN)
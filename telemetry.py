@@ -0,0 +1,90 @@
+# Search telemetry: the search (tree.py) counts what it does in tree.stats (nodes, leaves, cutoffs, transposition table
+# probes, time spent generating moves and evaluating...) and the player sends a summary of every move as a JSON line
+# to a file or a socket, to find out where the time of a move went.
+# The counters are plain attributes incremented by the search, cheap enough to be always on.
+
+import json
+import socket
+import time
+
+COUNTERS = ("nodes", "quiescence_nodes", "delta_prunes", "leaves", "expanded", "moves_generated", "cutoffs",
+            "first_move_cutoffs", "researches", "aspiration_researches", "reductions", "futility_prunes", "tt_probes",
+            "tt_hits", "tt_cutoffs", "forced_escapes", "repetitions", "generation_time", "evaluation_time")
+
+
+class SearchStats:
+    __slots__ = COUNTERS + ("iterations",)
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # called before every move
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        self.iterations = []
+
+    def counters(self):
+        return {name: getattr(self, name) for name in COUNTERS}
+
+    def add(self, counters):
+        # add the counters of another search, e.g. of a worker process of parallel.py
+        for name, value in counters.items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def iteration(self, depth, nodes, seconds):
+        # record an iteration of the iterative deepening completed with nodes in seconds
+        self.iterations.append({"depth": depth, "nodes": nodes, "seconds": seconds})
+
+    def report(self):
+        # return the counters and the rates derived from them
+        report = self.counters()
+        report["max_depth"] = self.iterations[-1]["depth"] if self.iterations else 0
+        report["iterations"] = list(self.iterations)
+        # how often the first move searched is the one causing the cutoff, a measure of the move ordering
+        report["first_move_cutoff_rate"] = self.first_move_cutoffs / self.cutoffs if self.cutoffs else None
+        report["tt_hit_rate"] = self.tt_hits / self.tt_probes if self.tt_probes else None
+        # the moves of the positions expanded, and the growth of the nodes from one iteration to the next
+        report["branching_factor"] = self.moves_generated / self.expanded if self.expanded else None
+        if len(self.iterations) > 1 and self.iterations[-2]["nodes"]:
+            report["effective_branching_factor"] = self.iterations[-1]["nodes"] / self.iterations[-2]["nodes"]
+        else:
+            report["effective_branching_factor"] = None
+        return report
+
+
+class Emitter:
+    # writes the records as JSON lines to a file, or sends them to "udp://host:port" or "tcp://host:port"; a record
+    # which cannot be sent is dropped, the telemetry never stops the player
+    def __init__(self, target):
+        self.file = self.sock = None
+        if target.startswith(("udp://", "tcp://")):
+            host, port = target[6:].rsplit(":", 1)
+            self.address = (host, int(port))
+            kind = socket.SOCK_DGRAM if target.startswith("udp://") else socket.SOCK_STREAM
+            self.sock = socket.socket(socket.AF_INET, kind)
+            if kind == socket.SOCK_STREAM:
+                try:
+                    self.sock.connect(self.address)
+                except OSError:
+                    self.sock = None
+        else:
+            self.file = open(target, "a", buffering=1)
+
+    def emit(self, record):
+        line = json.dumps(dict(record, time=time.time())) + "\n"
+        try:
+            if self.file is not None:
+                self.file.write(line)
+            elif self.sock is not None and self.sock.type == socket.SOCK_DGRAM:
+                self.sock.sendto(line.encode(), self.address)
+            elif self.sock is not None:
+                self.sock.sendall(line.encode())
+        except OSError:
+            pass
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+        if self.sock is not None:
+            self.sock.close()
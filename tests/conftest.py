@@ -0,0 +1,20 @@
+# The modules of the player live at the root of the repository
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import BitBoard  # noqa: E402
+
+
+def maskOf(*cells):
+    # return the bitboard of the (x, y) cells
+    return sum(BitBoard.BIT[BitBoard.square(x, y)] for x, y in cells)
+
+
+def boardOf(case):
+    # return the (board, player) of a (snapshot, player) case, the snapshots being the ones parametrizing the tests
+    snapshot, player = case
+    board = BitBoard.BitBoard()
+    board.setBoard(snapshot)
+    return board, player
@@ -0,0 +1,67 @@
+# The client must put the frames of the server back together whatever the reads they arrive in: split across reads,
+# several in one read, and larger than its buffer
+
+import asyncio
+import json
+import struct
+
+import asyncclient
+import benchmark
+import BitBoard
+
+
+def stateFrame(position, turn, padding=0):
+    # return the frame of a state of the server, padded with spaces to make it larger
+    state = {"padding": " " * padding, "board": benchmark.serverState(position), "turn": turn}
+    payload = json.dumps(state).encode()
+    return struct.pack(">i", len(payload)) + payload
+
+
+def expectedState(position, turn):
+    board = BitBoard.BitBoard()
+    board.convertBoard(benchmark.serverState(position))
+    return board.snapshot() + (turn.encode(),)
+
+
+def receive(chunks, count):
+    # serve the bytes of chunks one write at a time and return the first count states read by the client
+    async def serve(reader, writer):
+        for chunk in chunks:
+            writer.write(chunk)
+            await writer.drain()
+            await asyncio.sleep(0.01)
+        writer.close()
+
+    async def run():
+        server = await asyncio.start_server(serve, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.create_connection(asyncclient.StateProtocol, "127.0.0.1", port)
+        try:
+            return [await asyncio.wait_for(protocol.states.get(), 5) for _ in range(count)]
+        finally:
+            transport.close()
+            server.close()
+            await server.wait_closed()
+
+    return asyncio.run(run())
+
+
+def test_frame_larger_than_the_buffer():
+    position = benchmark.CORPUS[1][0]
+    frame = stateFrame(position, "BLACK", padding=10 * asyncclient.INITIAL_BUFFER)
+    assert receive([frame], 1) == [expectedState(position, "BLACK")]
+
+
+def test_frames_split_across_reads():
+    first, second = benchmark.CORPUS[0][0], benchmark.CORPUS[2][0]
+    data = stateFrame(first, "WHITE") + stateFrame(second, "BLACK", padding=2 * asyncclient.INITIAL_BUFFER)
+    # the length of the first frame cut in two, then the rest of it with the start of the second one
+    chunks = [data[:2], data[2:100], data[100:len(data) - 50], data[len(data) - 50:]]
+    assert receive(chunks, 2) == [expectedState(first, "WHITE"), expectedState(second, "BLACK")]
+
+
+def test_frames_in_one_read():
+    first, second = benchmark.CORPUS[3][0], benchmark.CORPUS[4][0]
+    states = receive([stateFrame(first, "WHITE") + stateFrame(second, "BLACKWIN")], 2)
+    assert states == [expectedState(first, "WHITE"), expectedState(second, "BLACKWIN")]
@@ -0,0 +1,56 @@
+# The numpy board (Board.py) and the bitboards (BitBoard.py) are two backends of the same rules: from the same
+# position they must generate the same moves, play them alike and give the heuristic the same answers
+
+import random
+
+import pytest
+
+import Board
+import BitBoard
+import benchmark
+import heuristics
+
+
+def boards(position):
+    # return the position of the corpus on both backends
+    state = benchmark.serverState(position)
+    pair = Board.Board(), BitBoard.BitBoard()
+    for board in pair:
+        board.convertBoard(state)
+    return pair
+
+
+def assertAlike(numpy_board, bit_board, player):
+    assert numpy_board.getPieceMasks() == bit_board.getPieceMasks()
+    assert numpy_board.getKey() == bit_board.getKey()
+    assert numpy_board.getKingSquare() == bit_board.getKingSquare()
+    assert numpy_board.isKingAtEdge() == bit_board.isKingAtEdge()
+    assert numpy_board.isKingCaptured() == bit_board.isKingCaptured()
+    assert heuristics.heuristic(numpy_board, 0) == heuristics.heuristic(bit_board, 0)
+    assert sorted(numpy_board.generateMoves(numpy_board.getBoard(), player)) == \
+        sorted(bit_board.generateMoves(bit_board.getBoard(), player))
+
+
+@pytest.mark.parametrize("index", range(len(benchmark.CORPUS)))
+def test_backends_play_alike(index):
+    # a random game from the position, played on both boards and taken back
+    position, player = benchmark.CORPUS[index]
+    numpy_board, bit_board = boards(position)
+    start = bit_board.getPieceMasks()
+    rng = random.Random(index)
+    played = 0
+    for ply in range(30):
+        assertAlike(numpy_board, bit_board, player)
+        moves = bit_board.generateMoves(bit_board.getBoard(), player)
+        if not moves or bit_board.isKingAtEdge() or bit_board.isKingCaptured():
+            break
+        move = rng.choice(moves)
+        numpy_board.makeMove(move)
+        bit_board.makeMove(move)
+        played += 1
+        player = "white" if player == "black" else "black"
+    for ply in range(played):
+        numpy_board.unmakeMove()
+        bit_board.unmakeMove()
+    assert numpy_board.getPieceMasks() == bit_board.getPieceMasks() == start
+    assert numpy_board.getKey() == bit_board.getKey()
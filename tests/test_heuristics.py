@@ -0,0 +1,39 @@
+# The heuristic must score the 8 images of a position (see symmetry.py) alike: the transposition table, the opening
+# book and the escape cache share one entry between them when symmetry is enabled
+
+import pytest
+
+import BitBoard
+import benchmark
+import heuristics
+import symmetry
+
+
+def image(board, t):
+    # return the image of the board under the symmetry t
+    masks = []
+    for mask in board.snapshot():
+        masks.append(sum(BitBoard.BIT[symmetry.PERMUTATIONS[t][sq]] for sq in BitBoard.squaresOf(mask)))
+    result = BitBoard.BitBoard()
+    result.setBoard(tuple(masks))
+    return result
+
+
+def positions():
+    # the positions of the corpus with the KING moved to every free square inside the edge
+    cases = []
+    for board, player in benchmark.loadCorpus():
+        white, black, king = board.snapshot()
+        for sq in range(BitBoard.SQUARES):
+            if not BitBoard.BIT[sq] & (white | black | BitBoard.EDGES | BitBoard.CAMPS):
+                cases.append((white, black, BitBoard.BIT[sq]))
+    return cases
+
+
+@pytest.mark.parametrize("snapshot", positions())
+def test_images_score_alike(snapshot):
+    board = BitBoard.BitBoard()
+    board.setBoard(snapshot)
+    score = heuristics.heuristic(board, 0)
+    for t in range(8):
+        assert heuristics.heuristic(image(board, t), 0) == score
@@ -0,0 +1,40 @@
+# The workers of the parallel search must search with the settings of the player, and start from the transposition
+# table file and give their tables back to be saved in it (see ttstore.py)
+
+import numpy as np
+
+import parallel
+import tree
+import tt
+
+
+def workerSettings():
+    # runs in a worker process
+    return tree.batch_leaves, tree.quiescence_search, tree.selective_search, tree.table.buckets
+
+
+def test_workers_get_the_settings():
+    tree.setBatchLeaves(True)
+    try:
+        search = parallel.ParallelSearch(2, 1)
+    finally:
+        tree.setBatchLeaves(False)
+    try:
+        batch_leaves, quiescence, selective, buckets = search.executor.submit(workerSettings).result()
+    finally:
+        search.close()
+    assert (batch_leaves, quiescence, selective) == (True, tree.quiescence_search, tree.selective_search)
+    # the memory of the table is shared out among the workers
+    assert buckets == tt.TranspositionTable(0.5).buckets
+
+
+def test_workers_start_with_the_records_and_give_their_tables_back():
+    records = np.zeros(2, dtype=tt.RECORD)
+    records["key"], records["depth"], records["score"] = [101, 202], [6, 7], [1.5, -3.0]
+    search = parallel.ParallelSearch(2, 1, records)
+    try:
+        entries = search.entries(5)
+    finally:
+        search.close()
+    # every worker has the records
+    assert sorted(entries["key"]) == [101, 101, 202, 202]
@@ -0,0 +1,80 @@
+# The quiescence search must return the same score whatever the window, and true bounds when the score falls outside
+# of it: the search above relies on it for its null windows and its transposition table bounds
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+import BitBoard
+import Move
+import benchmark
+import tree
+from conftest import boardOf
+from timemanager import Deadline
+
+EPSILON = 1e-6
+
+
+def openingCapture():
+    # the WHITE opens with 34_35 and the BLACK eats with the move 10410
+    board = BitBoard.BitBoard()
+    board.makeMove(next(move for move in board.generateMoves(board.getBoard(), "white")
+                        if Move.toString(move) == "34_35"))
+    board.makeMove(10410)
+    return board, "white"
+
+
+def positions():
+    # the (snapshot, player) of the capture above and of the positions reached by a few random captures from the
+    # corpus
+    board, player = openingCapture()
+    cases = [(board.snapshot(), player)]
+    rng = random.Random(7)
+    for board, player in benchmark.loadCorpus():
+        for ply in range(6):
+            moves = board.generateMoves(board.getBoard(), player)
+            captures = [move for move in moves if move & Move.CAPTURE]
+            board.makeMove(rng.choice(captures or moves))
+            player = "white" if player == "black" else "black"
+            if board.isKingAtEdge() or board.isKingCaptured():
+                break
+            if captures:
+                cases.append((board.snapshot(), player))
+    return cases
+
+
+@pytest.mark.parametrize("case", positions())
+def test_null_windows_agree_with_full_window(case):
+    board, player = boardOf(case)
+    timer = Deadline(math.inf)
+    score = tree.quiescence(board, player, -np.inf, np.inf, timer)
+    assert tree.quiescence(board, player, score - 1, score + 1, timer) == score
+    for offset in (-200, -50, -10, -1, 0, 1, 10, 50, 200):
+        alpha = score + offset - EPSILON / 2
+        bound = tree.quiescence(board, player, alpha, alpha + EPSILON, timer)
+        if bound <= alpha:
+            assert score <= bound
+        elif bound >= alpha + EPSILON:
+            assert score >= bound
+        else:
+            assert bound == score
+
+
+def test_opening_capture_null_window():
+    board, player = openingCapture()
+    timer = Deadline(math.inf)
+    score = tree.quiescence(board, player, -np.inf, np.inf, timer)
+    assert tree.quiescence(board, player, 13.999999, 14.0, timer) >= score
+
+
+def test_king_capture_is_searched():
+    # the BLACK moves 25_23 and captures the KING between 21 and 23, a move the generator does not flag as a capture
+    board = BitBoard.BitBoard()
+    board.setBoard((BitBoard.BIT[BitBoard.square(6, 6)],
+                    BitBoard.BIT[BitBoard.square(2, 1)] | BitBoard.BIT[BitBoard.square(2, 5)],
+                    BitBoard.BIT[BitBoard.square(2, 2)]))
+    forcing, captures = tree.tacticalMoves(board, "black")
+    assert [Move.toString(move) for move in forcing] == ["25_23"]
+    assert tree.quiescence(board, "black", -np.inf, np.inf, Deadline(math.inf)) >= tree.WIN_SCORE
@@ -0,0 +1,58 @@
+# The referee plays the moves with Ashton's rules: a move eats every sandwiched pawn, and the KING is captured on four
+# sides on the throne, on three next to it and like a pawn elsewhere
+
+import BitBoard
+import Move
+from conftest import maskOf
+from referee import kingCaptured, playMove
+
+
+def position(white, black, king):
+    board = BitBoard.BitBoard()
+    board.setBoard((maskOf(*white), maskOf(*black), maskOf(*king)))
+    return board
+
+
+def test_a_move_eats_every_sandwiched_pawn():
+    # the BLACK moving to (2, 2) sandwiches the WHITE pawns on (2, 3) and (3, 2), the engine eats only one of them
+    board = position([(2, 3), (3, 2)], [(2, 0), (2, 4), (4, 2)], [(6, 6)])
+    move = Move.encode(BitBoard.square(2, 0), BitBoard.square(2, 2))
+    assert sorted(playMove(board, move)) == sorted([BitBoard.square(2, 3), BitBoard.square(3, 2)])
+    assert board.getBoard() == (0, maskOf((2, 2), (2, 4), (4, 2)), maskOf((6, 6)))
+
+
+def test_camps_the_throne_and_the_king_are_anvils():
+    # the WHITE eats against a camp and against the KING, the BLACK against the throne
+    board = position([(2, 1), (6, 2)], [(1, 3), (3, 2), (6, 5)], [(4, 2)])
+    assert playMove(board, Move.encode(BitBoard.square(2, 1), BitBoard.square(2, 2))) == [BitBoard.square(3, 2)]
+    board = position([(2, 2), (1, 3)], [(1, 1)], [(6, 6)])
+    assert playMove(board, Move.encode(BitBoard.square(1, 1), BitBoard.square(1, 2))) == [BitBoard.square(1, 3)]
+    board = position([(4, 3)], [(4, 1)], [(6, 6)])
+    assert playMove(board, Move.encode(BitBoard.square(4, 1), BitBoard.square(4, 2))) == [BitBoard.square(4, 3)]
+
+
+def test_the_king_does_not_eat():
+    board = position([], [(2, 3)], [(2, 6)])
+    assert playMove(board, Move.encode(BitBoard.square(2, 6), BitBoard.square(2, 4))) == []
+    assert board.getBoard() == (0, maskOf((2, 3)), maskOf((2, 4)))
+
+
+def test_king_on_the_throne_is_captured_on_four_sides():
+    black = [(3, 4), (5, 4), (4, 3), (4, 5)]
+    assert kingCaptured(position([], black, [(4, 4)]), BitBoard.square(3, 4))
+    assert not kingCaptured(position([], black[:3], [(4, 4)]), BitBoard.square(3, 4))
+
+
+def test_king_next_to_the_throne_is_captured_on_three_sides():
+    black = [(2, 4), (3, 3), (3, 5)]
+    assert kingCaptured(position([], black, [(3, 4)]), BitBoard.square(2, 4))
+    assert not kingCaptured(position([], black[:2], [(3, 4)]), BitBoard.square(2, 4))
+
+
+def test_king_elsewhere_is_sandwiched_like_a_pawn():
+    assert kingCaptured(position([], [(2, 1), (2, 3)], [(2, 2)]), BitBoard.square(2, 3))
+    # against a camp
+    assert kingCaptured(position([], [(2, 3)], [(1, 3)]), BitBoard.square(2, 3))
+    # the piece which moved must be one of the two sides
+    assert not kingCaptured(position([], [(2, 1), (2, 3)], [(2, 2)]), BitBoard.square(3, 3))
+    assert not kingCaptured(position([], [(2, 3)], [(2, 2)]), BitBoard.square(2, 3))
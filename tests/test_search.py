@@ -0,0 +1,102 @@
+# The principal variation search, with its null windows, aspiration windows, transposition table and selective search
+# on as by default, must find the same score as a plain alpha-beta search of the whole window
+
+import math
+
+import numpy as np
+import pytest
+
+import BitBoard
+import Move
+import benchmark
+import escape
+import tree
+import zobrist
+from history import DRAW_SCORE, GameHistory
+from conftest import boardOf, maskOf
+from timemanager import Deadline
+
+
+def reference(board, depth, player, alpha, beta, history, timer, ply=0):
+    # fail-soft alpha-beta with the rules of tree.negamax (repetitions, games over, quiescence at the horizon, forced
+    # escapes) but without null windows, transposition table and selective search
+    side = tree.sideOf(player)
+    key = zobrist.searchKey(board.getKey(), player)
+    if ply > 0 and history.isRepetition(key):
+        return side * DRAW_SCORE
+    if ply > 0 and (board.isKingAtEdge() or board.isKingCaptured()):
+        return side * tree.evaluate(board, 0)
+    if depth == 0:
+        return tree.quiescence(board, player, -np.inf, np.inf, timer)
+    if ply > 0 and escape.forcedEscape(board, player):
+        return side * tree.evaluate(board, -tree.ESCAPE_SCORE)
+    moves = tree.orderedMoves(board, player, ply, None)
+    if not moves:
+        return side * tree.evaluate(board, -side * tree.ESCAPE_SCORE)
+    best = -np.inf
+    history.push(key)
+    try:
+        # the order of the moves changes the cutoffs but not the score
+        for move in moves:
+            board.makeMove(move)
+            try:
+                score = -reference(board, depth - 1, tree.opponentOf(player), -beta, -alpha, history, timer, ply + 1)
+            finally:
+                board.unmakeMove()
+            best = max(best, score)
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+    finally:
+        history.pop(key)
+    return best
+
+
+def positions():
+    # the initial position and a few positions of the middle game
+    board = BitBoard.BitBoard()
+    return [(board.snapshot(), "white")] + [(board.snapshot(), player) for board, player in benchmark.loadCorpus()[1:4]]
+
+
+@pytest.fixture(autouse=True)
+def defaults():
+    # the default settings, whatever the other tests set
+    assert tree.quiescence_search and tree.selective_search
+    tree.table.clear()
+    tree.newSearch()
+    yield
+    tree.table.clear()
+
+
+@pytest.mark.parametrize("depth", [1, 2, 3])
+@pytest.mark.parametrize("case", positions())
+def test_principal_variation_search_agrees_with_full_window(case, depth):
+    board, player = boardOf(case)
+    timer = Deadline(math.inf)
+    side = tree.sideOf(player)
+    expected = side * reference(board, depth, player, -np.inf, np.inf, GameHistory(), timer)
+    assert tree.minimax(board, depth, player, -np.inf, np.inf, GameHistory(), timer)[0] == expected
+    # searched again with the table filled, and with an aspiration window around the score of the iteration before
+    assert tree.minimax(board, depth, player, -np.inf, np.inf, GameHistory(), timer)[0] == expected
+    guess = tree.minimax(board, depth - 1, player, -np.inf, np.inf, GameHistory(), timer)[0] if depth > 1 else None
+    assert tree.aspirationSearch(board, depth, player, guess, GameHistory(), timer)[0] == expected
+
+
+@pytest.mark.parametrize("depth", [1, 2, 3])
+def test_king_capture_is_seen_at_every_depth(depth):
+    # the BLACK captures the KING with 25_23, the WHITE to move after it must not be taken for a forced escape
+    board, player = boardOf(((maskOf((6, 6)), maskOf((2, 1), (2, 5)), maskOf((2, 2))), "black"))
+    score, move = tree.minimax(board, depth, "black", -np.inf, np.inf, GameHistory(), Deadline(math.inf))
+    assert score >= tree.WIN_SCORE
+    assert Move.toString(move) == "25_23"
+
+
+@pytest.mark.parametrize("depth", [1, 2])
+def test_no_move_loses_the_game(depth):
+    # the BLACK pawn in the corner is walled in by the WHITE, the BLACK to move has no move and loses
+    board, player = boardOf(((maskOf((0, 1), (1, 0)), maskOf((0, 0)), maskOf((4, 4))), "black"))
+    timer = Deadline(math.inf)
+    score, move = tree.minimax(board, depth, player, -np.inf, np.inf, GameHistory(), timer)
+    assert score <= -tree.WIN_SCORE and move is None
+    # and below the root
+    assert tree.negamax(board, depth, player, -np.inf, np.inf, GameHistory(), timer, 1)[0] == score
@@ -0,0 +1,47 @@
+# The buckets of the transposition table have two entries: the depth-preferred one is replaced by results at least as
+# deep or when it comes from an older search, the other one is always replaced
+
+import tt
+
+
+def test_shallower_results_go_to_the_always_replace_entry():
+    # a table of one bucket, every key falls in it
+    table = tt.TranspositionTable(0)
+    assert table.buckets == 1
+    table.store(1, 5, tt.EXACT, 10.0, 100)
+    table.store(2, 3, tt.LOWER, 20.0, 200)
+    assert table.probe(1) == (5, tt.EXACT, 10.0, 100)
+    assert table.probe(2) == (3, tt.LOWER, 20.0, 200)
+    # the next shallow result replaces the always-replace entry, the deep one stays
+    table.store(3, 2, tt.UPPER, 30.0, None)
+    assert table.probe(2) is None
+    assert table.probe(1) == (5, tt.EXACT, 10.0, 100)
+    assert table.probe(3) == (2, tt.UPPER, 30.0, None)
+
+
+def test_deeper_results_replace_the_depth_preferred_entry():
+    table = tt.TranspositionTable(0)
+    table.store(1, 5, tt.EXACT, 10.0, 100)
+    table.store(2, 5, tt.EXACT, 20.0, 200)
+    assert table.probe(1) is None
+    assert table.probe(2) == (5, tt.EXACT, 20.0, 200)
+    table.store(3, 7, tt.EXACT, 30.0, 300)
+    assert table.probe(2) is None
+    assert table.probe(3) == (7, tt.EXACT, 30.0, 300)
+
+
+def test_the_same_position_is_updated_in_place():
+    table = tt.TranspositionTable(0)
+    table.store(1, 5, tt.EXACT, 10.0, 100)
+    table.store(1, 2, tt.LOWER, 15.0, 150)
+    assert table.probe(1) == (2, tt.LOWER, 15.0, 150)
+    assert table.entries()["key"].tolist() == [1]
+
+
+def test_entries_of_older_searches_are_replaced():
+    table = tt.TranspositionTable(0)
+    table.store(1, 9, tt.EXACT, 10.0, 100)
+    table.newSearch()
+    table.store(2, 1, tt.EXACT, 20.0, 200)
+    assert table.probe(1) is None
+    assert table.probe(2) == (1, tt.EXACT, 20.0, 200)
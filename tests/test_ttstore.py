@@ -0,0 +1,45 @@
+# The results saved by a game must come back in the next one: save, load and the merge of the files of several games
+
+import numpy as np
+
+import tt
+import ttstore
+
+
+def filledTable(entries):
+    # a table holding the (key, depth, score) entries
+    table = tt.TranspositionTable(1)
+    for key, depth, score in entries:
+        table.store(key, depth, tt.EXACT, score, 123)
+    return table
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "table.tt")
+    # the shallow entry is not saved
+    assert ttstore.save(filledTable([(11, 5, 1.5), (22, 3, -2.0), (33, 2, 7.0)]), path) == 2
+    table = tt.TranspositionTable(1)
+    assert ttstore.load(table, path) == 2
+    assert table.probe(11) == (5, tt.EXACT, 1.5, 123)
+    assert table.probe(22) == (3, tt.EXACT, -2.0, 123)
+    assert table.probe(33) is None
+
+
+def test_save_merges_with_the_file(tmp_path):
+    path = str(tmp_path / "table.tt")
+    ttstore.save(filledTable([(11, 5, 1.5), (22, 3, -2.0)]), path)
+    # a later game searched 11 less deep and 22 deeper, and found 44
+    assert ttstore.save(filledTable([(11, 4, 9.0), (22, 6, 4.0), (44, 3, 0.5)]), path) == 3
+    records = ttstore.read(path)
+    assert list(records["key"]) == [11, 22, 44]
+    assert list(records["depth"]) == [5, 6, 3]
+    assert list(records["score"]) == [1.5, 4.0, 0.5]
+
+
+def test_merge_keeps_the_deepest_records():
+    records = np.zeros(4, dtype=tt.RECORD)
+    records["key"] = [7, 3, 7, 5]
+    records["depth"] = [3, 4, 8, 4]
+    merged = ttstore.merge(records[:2], records[2:])
+    assert list(merged["key"]) == [3, 5, 7]
+    assert list(merged["depth"]) == [4, 4, 8]
@@ -0,0 +1,56 @@
+# The TimeManager keeps track of the time left for the current move. tree.timeOut checks its hard deadline at every
+# node, while iterative deepening asks it whether the next iteration can finish before the deadline, estimating its
+# length from the nodes and the time of the previous iterations.
+
+import time
+
+# seconds always kept aside for sending the move and for the network, plus a fraction of the timeout
+SAFETY_SECONDS = 1.0
+SAFETY_FRACTION = 0.05
+# bounds of the growth factor of the nodes from one iteration to the next one
+MIN_GROWTH = 2.0
+MAX_GROWTH = 40.0
+# the iterations shorter than this are too short to time (e.g. answered by the transposition table) and are left out
+# of the estimates
+MIN_TIMED_SECONDS = 0.005
+
+
+class TimeManager:
+    def __init__(self, timeout):
+        # timeout is the time given by the server for every move, the search can use all of it but the margin
+        self.move_time = float(timeout)
+        self.timeout = max(0.1, self.move_time - SAFETY_SECONDS - SAFETY_FRACTION * self.move_time)
+        self.time = 0
+
+    def start(self):
+        # called when the state arrives from the server
+        self.time = time.time()
+
+    def elapsed(self):
+        return time.time() - self.time
+
+    def remaining(self):
+        return self.timeout - self.elapsed()
+
+    def canStartIteration(self, iterations):
+        # check if an iteration can end before the deadline, given the (nodes, seconds) of the iterations already
+        # done, one per depth: the next one should search the nodes of the last timed one times the growth per
+        # depth (the effective branching factor, the larger of the last two, which differ between odd and even
+        # depths) at the slower of their times per node
+        timed = [(depth, nodes, seconds) for depth, (nodes, seconds) in enumerate(iterations)
+                 if seconds >= MIN_TIMED_SECONDS and nodes > 0]
+        if not timed:
+            return True
+        growths = [(nodes / previous_nodes) ** (1 / (depth - previous_depth))
+                   for (previous_depth, previous_nodes, _), (depth, nodes, _) in zip(timed, timed[1:])]
+        growth = min(MAX_GROWTH, max([MIN_GROWTH] + growths[-2:])) if growths else MAX_GROWTH
+        seconds_per_node = max(seconds / nodes for _, nodes, seconds in timed[-2:])
+        depth, nodes, _ = timed[-1]
+        return nodes * growth ** (len(iterations) - depth) * seconds_per_node < self.remaining()
+
+
+class Deadline:
+    # a timer for tree.timeOut which expires at an absolute time.time(), used by the search workers of parallel.py
+    def __init__(self, deadline):
+        self.time = 0
+        self.timeout = deadline
@@ -3,65 +3,527 @@
 # the tree is generated using the heuristic function defined in heuristics.py
 
 import time
+from time import perf_counter
 import numpy as np
+from history import DRAW_SCORE
 import Board
+import BitBoard
+import Move
 import heuristics
+import batcheval
+import escape
+import ordering
+import symmetry
+import telemetry
+import tt
+import zobrist
 
+# the board backends the search can run on, they expose the same methods
+BACKENDS = {"numpy": Board.Board, "bitboard": BitBoard.BitBoard}
+backend = BitBoard.BitBoard
+backend_name = "bitboard"
 
-# define the minimax algorithm
-def minimax(board, depth, player, alpha, beta, preceding_moves, timer):
+
+def setBackend(name):
+    # select the board backend used by the search
+    global backend, backend_name
+    backend = BACKENDS[name]
+    backend_name = name
+
+
+# the transposition table shared by all the searches of the player
+table = tt.TranspositionTable()
+
+
+def setTableSize(size_mb):
+    # replace the transposition table with an empty one of the given size in MB
+    global table
+    table = tt.TranspositionTable(size_mb)
+
+
+def positionKey(board, player):
+    # return the key of the position in the transposition table and the symmetry of the moves stored under it: with
+    # symmetry enabled the key is the canonical key and the moves are stored as in the canonical image
+    if symmetry.enabled:
+        key, image = board.getCanonicalKey()
+        return zobrist.searchKey(key, player), image
+    return zobrist.searchKey(board.getKey(), player), symmetry.IDENTITY
+
+
+def probeTable(key, depth, alpha, beta, image=symmetry.IDENTITY):
+    # look the position up in the transposition table, returning (score, move): score is not None when the stored
+    # result is deep enough to answer for the (alpha, beta) window, move is the best move found by an earlier search
+    stats.tt_probes += 1
+    entry = table.probe(key)
+    if entry is None:
+        return None, None
+    stats.tt_hits += 1
+    entry_depth, bound, score, move = entry
+    if move is not None and image != symmetry.IDENTITY:
+        move = symmetry.mapMove(move, symmetry.INVERSE[image])
+    if entry_depth >= depth:
+        if bound == tt.EXACT or (bound == tt.LOWER and score >= beta) or (bound == tt.UPPER and score <= alpha):
+            stats.tt_cutoffs += 1
+            return score, move
+    return None, move
+
+
+def storeTable(key, depth, alpha, beta, score, move, image=symmetry.IDENTITY):
+    # store the result of the search of a position, given the window it was searched with
+    if move is not None and image != symmetry.IDENTITY:
+        move = symmetry.mapMove(move, image)
+    if score <= alpha:
+        bound = tt.UPPER
+    elif score >= beta:
+        bound = tt.LOWER
+    else:
+        bound = tt.EXACT
+    table.store(key, depth, bound, score, move)
+
+
+# when True the children of the nodes at depth 1 are scored all at once by batcheval
+batch_leaves = False
+
+
+def setBatchLeaves(enabled):
+    global batch_leaves
+    batch_leaves = enabled
+
+
+def frontierScores(board, moves):
+    # return the heuristic scores of the positions reached by the moves, computed with one batcheval call
+    snapshots = []
+    for move in moves:
+        board.makeMove(move)
+        snapshots.append(board.snapshot())
+        board.unmakeMove()
+    start = perf_counter()
+    scores = batcheval.heuristicFromSnapshots(snapshots).tolist()
+    stats.leaves += len(scores)
+    stats.evaluation_time += perf_counter() - start
+    return scores
+
+
+# the killer moves and history scores shared by all the searches of the player
+orderer = ordering.MoveOrderer()
+
+
+def newSearch():
+    # called before searching a new move
+    table.newSearch()
+    orderer.newSearch()
+
+
+# what the search does, reported by the player after every move (see telemetry.py)
+stats = telemetry.SearchStats()
+
+
+def orderedMoves(board, player, ply, tt_move):
+    # return the moves of the position, best ones first
+    start = perf_counter()
+    moves = board.generateMoves(board.getBoard(), player)
+    stats.generation_time += perf_counter() - start
+    stats.expanded += 1
+    stats.moves_generated += len(moves)
+    return orderer.order(board, moves, player, ply, tt_move)
+
+
+def evaluate(board, score):
+    # return the heuristic score of the board
+    start = perf_counter()
+    score = heuristics.heuristic(board, score)
+    stats.evaluation_time += perf_counter() - start
+    stats.leaves += 1
+    return score
+
+
+# when True the positions at depth 0 are searched by quiescence instead of being evaluated at once
+quiescence_search = True
+# the deepest quiescence search, in plies after the horizon
+MAX_QUIESCENCE = 6
+# the least a capture which is not a forcing move must add to the heuristic score to be searched by quiescence: the
+# pieces are worth a few points, the captures below it only shuffle the threats and the quadrants
+QUIESCENCE_GAIN = 10
+
+
+def setQuiescence(enabled):
+    global quiescence_search
+    quiescence_search = enabled
+
+
+def tacticalMoves(board, player):
+    # return the moves searched by quiescence as (forcing, captures): the forcing moves are always searched, they are
+    # the KING moves eating a piece or going to the edge or to a square with an open line to it and the BLACK moves
+    # next to the KING which eat a piece or the KING itself; the other captures (flagged by the move generator with
+    # the rules of checkIfEat) may be skipped by the delta pruning
+    moves = board.generateMoves(board.getBoard(), player)
+    king = board.getKingSquare()
+    forcing, captures = [], []
+    for move in moves:
+        if king < 0:
+            if move & Move.CAPTURE:
+                captures.append(move)
+        elif player == "black":
+            if BitBoard.NEIGHBOUR_MASKS[king] & BitBoard.BIT[Move.toSquare(move)]:
+                if move & Move.CAPTURE or capturesKing(board, move):
+                    forcing.append(move)
+            elif move & Move.CAPTURE:
+                captures.append(move)
+        elif Move.fromSquare(move) == king:
+            to_square = Move.toSquare(move)
+            if move & Move.CAPTURE or BitBoard.EDGES & BitBoard.BIT[to_square] or \
+                    board.openLinesToEdge(to_square, king):
+                forcing.append(move)
+        elif move & Move.CAPTURE:
+            captures.append(move)
+    return forcing, captures
+
+
+def capturesKing(board, move):
+    # check if the BLACK move captures the KING
+    board.makeMove(move)
+    captured = board.isKingCaptured()
+    board.unmakeMove()
+    return captured
+
+
+def captureSwing(board):
+    # return the most a capture which is not a forcing move (see tacticalMoves) can change the heuristic of the board,
+    # term by term: three pieces eaten, the quadrants of the black pieces moved or eaten, the threats of all the
+    # pieces, the black pieces around the KING and the escape distance
+    weights = heuristics.weights
+    pieces = max(abs(weights["white_extra_piece"]), abs(weights["black_extra_piece"]))
+    quadrants = max(abs(level) for level in heuristics.LEVEL_WEIGHTS.values())
+    threats = (board.getWhitePieces() + 1) * (abs(weights["white_eat"]) + abs(weights["white_block"])) + \
+        board.getBlackPieces() * abs(weights["black_eat"])
+    escapes = max(heuristics.ESCAPE_SCORES) - min(heuristics.ESCAPE_SCORES)
+    return 3 * pieces + 6 * quadrants + threats + 4 * abs(weights["king_surrounded"]) + escapes
+
+
+def captureGain(board, move, player, masks):
+    # return an upper bound of what the capture, not a forcing move, adds to the heuristic score of the player,
+    # without playing it; masks are the pieces of the board (see getPieceMasks). The terms of captureSwing are bound
+    # move by move: the threats change only for the pieces on the lines of the squares the capture empties or fills,
+    # the black pieces around the KING only when the capture moves one away or eats one, and the escape distance
+    # only in favour of the player
+    weights = heuristics.weights
+    white, black, king = masks
+    from_square, to_square = Move.fromSquare(move), Move.toSquare(move)
+    pieces = max(abs(weights["white_extra_piece"]), abs(weights["black_extra_piece"]))
+    quadrants = max(abs(level) for level in heuristics.LEVEL_WEIGHTS.values())
+    lines = BitBoard.CAPTURE_LINES[to_square] | BitBoard.LINE_MASKS[from_square]
+    threats = (white & lines).bit_count() * (abs(weights["white_eat"]) + abs(weights["white_block"])) + \
+        (black & lines).bit_count() * abs(weights["black_eat"])
+    gain = 3 * pieces + 6 * quadrants + threats
+    near_king = BitBoard.NEIGHBOUR_MASKS[king.bit_length() - 1] if king else 0
+    scores = heuristics.ESCAPE_SCORES
+    distance = escape.escapeDistance(board)
+    if player == "white":
+        # the black pieces eaten next to the KING are next to the landing square too
+        gain += abs(weights["king_surrounded"]) * (BitBoard.NEIGHBOUR_MASKS[to_square] & near_king).bit_count()
+        return gain + max(scores[1:]) - scores[distance]
+    if near_king & BitBoard.BIT[from_square]:
+        gain += abs(weights["king_surrounded"])
+    return gain + scores[distance] - min(scores[1:])
+
+
+def sideOf(player):
+    # the heuristic scores are seen by the BLACK: the negamax search multiplies them by the side of the player to move
+    return 1 if player == "black" else -1
+
+
+def opponentOf(player):
+    return "white" if player == "black" else "black"
+
+
+def quiescence(board, player, alpha, beta, timer, qdepth=0, stand_pat=None):
+    # return the score, seen by the player to move, of the position once the captures and the KING escapes pending at
+    # the horizon are played out; the player to move may also stand pat, i.e. keep the heuristic score of the position
+    # (stand_pat, when the caller already has it)
+    stats.nodes += 1
+    stats.quiescence_nodes += 1
+    if timeOut(timer):
+        raise TimeoutError
+    if stand_pat is None:
+        stand_pat = sideOf(player) * evaluate(board, 0)
+    if qdepth >= MAX_QUIESCENCE or board.isKingAtEdge() or board.isKingCaptured() or stand_pat >= beta:
+        return stand_pat
+    alpha = max(alpha, stand_pat)
+    forcing, captures = tacticalMoves(board, player)
+    best = stand_pat
+    # delta pruning: the captures which cannot bring the score up to alpha are skipped, and the bound of their score,
+    # stand_pat + their gain, is the bound returned for them
+    if captures:
+        swing = captureSwing(board)
+        if stand_pat + swing <= alpha:
+            stats.delta_prunes += len(captures)
+            best = stand_pat + swing
+            captures = []
+        else:
+            # the captures which may gain the most first
+            masks = board.getPieceMasks()
+            captures = sorted(((captureGain(board, move, player, masks), move) for move in captures),
+                              key=lambda entry: entry[0], reverse=True)
+    forcing = [(None, move) for move in forcing]
+    # the forcing moves first, they may win the game
+    for gain, move in forcing + captures:
+        if gain is not None and stand_pat + gain <= alpha:
+            stats.delta_prunes += 1
+            best = max(best, stand_pat + gain)
+            continue
+        board.makeMove(move)
+        try:
+            static = sideOf(player) * evaluate(board, 0)
+            if gain is not None and static - stand_pat < QUIESCENCE_GAIN:
+                # a capture gaining too little is not searched
+                stats.delta_prunes += 1
+                continue
+            if static <= alpha:
+                # the opponent may stand pat after the move, its score is at most the static one
+                stats.delta_prunes += 1
+                best = max(best, static)
+                continue
+            score = -quiescence(board, opponentOf(player), -beta, -alpha, timer, qdepth + 1, -static)
+        finally:
+            board.unmakeMove()
+        best = max(best, score)
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            stats.cutoffs += 1
+            break
+    return best
+
+
+# the width of the null windows of the principal variation search, below the smallest difference between two scores
+NULL_WINDOW = 1e-6
+
+
+# when True the search reduces the late quiet moves and prunes the futile ones
+selective_search = True
+# how far below alpha the static score may be at depth 1, 2 for a quiet move to bring it back
+FUTILITY_MARGINS = (0, 60, 180)
+# the moves of a position searched at full depth before the reductions start, and the depth they need
+REDUCTION_MOVES = 3
+REDUCTION_DEPTH = 3
+
+
+def setSelective(enabled):
+    global selective_search
+    selective_search = enabled
+
+
+def isQuietMove(move, king):
+    # the moves which are neither reduced nor pruned are the captures, the KING moves and the moves from or to the row
+    # or the column of the KING: the ones threatening it, blocking its lines to the edge or opening them
+    if move & Move.CAPTURE or king < 0:
+        return False
+    from_square, to_square = Move.fromSquare(move), Move.toSquare(move)
+    king_x, king_y = divmod(king, Move.SIZE)
+    return from_square // Move.SIZE != king_x and from_square % Move.SIZE != king_y and \
+        to_square // Move.SIZE != king_x and to_square % Move.SIZE != king_y
+
+
+def lateMoveReduction(depth, index):
+    # return how many plies less the quiet move of the given index is searched at first, the later the move the more
+    if depth < REDUCTION_DEPTH or index < REDUCTION_MOVES:
+        return 0
+    if depth >= 5 and index >= 4 * REDUCTION_MOVES:
+        return 2
+    return 1
+
+
+# define the negamax algorithm: the score is seen by the player to move, so that the BLACK and the WHITE share the same
+# code. The moves are played and taken back on board itself (makeMove / unmakeMove) so that the search walks a single
+# position; board is left as it was found, even when the search times out.
+# It is a principal variation search: the first move, the best one if the ordering is right, is searched with the
+# (alpha, beta) window and the others with a null window which only proves that they are not better; the moves which
+# turn out to be better are searched again with the whole window
+def negamax(board, depth, player, alpha, beta, history, timer, ply=0):
+    stats.nodes += 1
     if timeOut(timer):
         raise TimeoutError
-    board_class = Board.Board()
-    board_class.setBoard(board)
-    # if the depth is 0, return the heuristic score of the board
+    side = sideOf(player)
+    # a position already reached in the game or on the search path is a draw
+    game_key = zobrist.searchKey(board.getKey(), player)
+    if ply > 0 and history.isRepetition(game_key):
+        stats.repetitions += 1
+        return side * DRAW_SCORE, None
+    # the game is over when the KING is captured or on the edge, the heuristic scores it as won or lost
+    if ply > 0 and (board.isKingAtEdge() or board.isKingCaptured()):
+        return side * evaluate(board, 0), None
+    # if the depth is 0, return the heuristic score of the board, after the pending captures and escapes
     if depth == 0:
-        return heuristics.heuristic(board_class, 0), None
-    # if the player is WHITE, return the maximum score
-    if player == "black":
-        maxEval = -np.inf
-        best_move = None
-        # generate all the possible moves for the WHITE
-        moves = board_class.generateMoves(board, player)
-        # for each move, generate the new board and call the minimax algorithm recursively
-        for move in moves:
-            new_board = Board.Board()
-            new_board.setBoard(board)
-            new_board.setBoard(new_board.movePiece(move))
-            tmp_eval, tmp_move = minimax(new_board.getBoard(), depth - 1, "white", alpha, beta, preceding_moves, timer)
-            maxEval = max(maxEval, tmp_eval)
-            alpha = max(alpha, tmp_eval)
-            if maxEval == tmp_eval:
-                # if this move is in the player's best moves, then discard it
-                if move not in preceding_moves:
-                    best_move = move
+        if quiescence_search:
+            stats.nodes -= 1
+            return quiescence(board, player, alpha, beta, timer), None
+        return side * evaluate(board, 0), None
+    # the positions already searched deep enough are answered by the transposition table, which keeps the scores seen
+    # by the BLACK
+    key, image = positionKey(board, player)
+    tt_score, tt_move = probeTable(key, depth, *blackWindow(side, alpha, beta), image)
+    if tt_score is not None:
+        return side * tt_score, tt_move
+    # a KING which escapes whatever the BLACK does needs no search (at the root the move is needed)
+    if ply > 0 and escape.forcedEscape(board, player):
+        stats.forced_escapes += 1
+        return side * evaluate(board, -ESCAPE_SCORE), None
+    window = blackWindow(side, alpha, beta)
+    opponent = opponentOf(player)
+    best_score = -np.inf
+    best_move = None
+    # generate all the possible moves, best ones first
+    moves = orderedMoves(board, player, ply, tt_move)
+    # a player with no move loses the game
+    if not moves:
+        return side * evaluate(board, -side * ESCAPE_SCORE), None
+    # at depth 1 the children may be scored all at once
+    scores = frontierScores(board, moves) if depth == 1 and batch_leaves and not quiescence_search else None
+    # near the horizon the quiet moves are not searched when the position is so far below alpha that they cannot bring
+    # it back (futility pruning)
+    selective = selective_search and ply > 0 and scores is None
+    king = board.getKingSquare()
+    futile = selective and depth < len(FUTILITY_MARGINS) and abs(alpha) < WIN_SCORE and \
+        side * evaluate(board, 0) + FUTILITY_MARGINS[depth] <= alpha
+    # for each move, play it and call the negamax algorithm recursively, with the position on the search path
+    history.push(game_key)
+    try:
+        for index, move in enumerate(moves):
+            quiet = selective and index > 0 and isQuietMove(move, king)
+            if futile and quiet:
+                stats.futility_prunes += 1
+                continue
+            if scores is not None:
+                score = side * scores[index]
+            else:
+                board.makeMove(move)
+                try:
+                    if index == 0:
+                        score = -negamax(board, depth - 1, opponent, -beta, -alpha, history, timer, ply + 1)[0]
+                    else:
+                        # the late quiet moves are searched less deep first, and at full depth only if they beat alpha
+                        # (late move reductions)
+                        reduction = lateMoveReduction(depth, index) if quiet else 0
+                        if reduction:
+                            stats.reductions += 1
+                            score = -negamax(board, depth - 1 - reduction, opponent, -alpha - NULL_WINDOW, -alpha,
+                                             history, timer, ply + 1)[0]
+                        if not reduction or score > alpha:
+                            score = -negamax(board, depth - 1, opponent, -alpha - NULL_WINDOW, -alpha, history, timer,
+                                             ply + 1)[0]
+                        if alpha < score < beta:
+                            stats.researches += 1
+                            score = -negamax(board, depth - 1, opponent, -beta, -score, history, timer,
+                                             ply + 1)[0]
+                finally:
+                    board.unmakeMove()
+            best_score = max(best_score, score)
+            alpha = max(alpha, score)
+            if best_score == score:
+                best_move = move
             if beta <= alpha:
+                stats.cutoffs += 1
+                if index == 0:
+                    stats.first_move_cutoffs += 1
+                orderer.cutoff(move, player, ply, depth)
                 break
-        if best_move is None:
-            best_move = moves[0]
-        return maxEval, best_move
-    # if the player is BLACK, return the minimum score
-    else:
-        minEval = np.inf
-        best_move = None
-        # generate all the possible moves for the BLACK
-        moves = board_class.generateMoves(board, player)
-        # for each move, generate the new board and call the minimax algorithm recursively
-        for move in moves:
-            new_board = Board.Board()
-            new_board.setBoard(board)
-            new_board.setBoard(new_board.movePiece(move))
-            tmp_eval, tmp_move = minimax(new_board.getBoard(), depth - 1, "black", alpha, beta, preceding_moves, timer)
-            minEval = min(minEval, tmp_eval)
-            beta = min(beta, tmp_eval)
-            if minEval == tmp_eval:
-                if move not in preceding_moves:
-                    best_move = move
-            if beta <= alpha:
+    finally:
+        history.pop(game_key)
+    if best_move is None:
+        best_move = moves[0]
+    storeTable(key, depth, *window, side * best_score, best_move, image)
+    return best_score, best_move
+
+
+def blackWindow(side, alpha, beta):
+    # return the (alpha, beta) window of the player of the given side seen by the BLACK
+    return (alpha, beta) if side > 0 else (-beta, -alpha)
+
+
+def minimax(board, depth, player, alpha, beta, history, timer, ply=0):
+    # return the (score, move) of the position, with the score and the (alpha, beta) window seen by the BLACK as in the
+    # heuristic: the BLACK maximizes and the WHITE minimizes
+    side = sideOf(player)
+    score, move = negamax(board, depth, player, *blackWindow(side, alpha, beta), history, timer, ply)
+    return side * score, move
+
+
+# subtracted from the score of the positions where the KING escapes by force, as the KING on the edge
+ESCAPE_SCORE = 10000
+# the deepest iteration tried by iterativeDeepening
+MAX_DEPTH = 64
+# scores beyond this one are won or lost games, there is no point in searching deeper
+WIN_SCORE = 5000
+
+
+# the half width of the first aspiration window, doubled every time the score falls outside of it
+ASPIRATION_WINDOW = 25
+
+
+def aspirationSearch(board, depth, player, guess, history, timer):
+    # search the position with a narrow window around the score of the previous iteration, which cuts off more moves;
+    # when the score falls outside of it the window is widened on that side and the position searched again
+    if guess is None or abs(guess) >= WIN_SCORE:
+        return minimax(board, depth, player, -np.inf, np.inf, history, timer)
+    delta = ASPIRATION_WINDOW
+    alpha, beta = guess - delta, guess + delta
+    while True:
+        score, best_move = minimax(board, depth, player, alpha, beta, history, timer)
+        if score <= alpha:
+            alpha = -np.inf if delta >= WIN_SCORE else score - delta
+        elif score >= beta:
+            beta = np.inf if delta >= WIN_SCORE else score + delta
+        else:
+            return score, best_move
+        stats.aspiration_researches += 1
+        delta *= 2
+
+
+def iterativeDeepening(board, player, history, timer, max_depth=MAX_DEPTH):
+    # search at depth 1, 2, 3... while the time manager expects the next iteration to end in time, and return the
+    # (score, move, depth) of the last completed iteration. Every iteration starts from the best moves of the previous
+    # one, stored in the transposition table, and an iteration cut by the timeout is thrown away
+    score, best_move, completed = None, None, 0
+    iterations = []
+    for depth in range(1, max_depth + 1):
+        if completed and not timer.canStartIteration(iterations):
+            break
+        start = time.time()
+        nodes = stats.nodes
+        try:
+            score, best_move = aspirationSearch(board, depth, player, score, history, timer)
+        except TimeoutError:
+            break
+        completed = depth
+        iterations.append((stats.nodes - nodes, time.time() - start))
+        stats.iteration(depth, *iterations[-1])
+        if abs(score) >= WIN_SCORE:
+            break
+    if best_move is None:
+        # not even the first iteration ended, play the first move, if any
+        moves = board.generateMoves(board.getBoard(), player)
+        best_move = moves[0] if moves else None
+    return score, best_move, completed
+
+
+def principalVariation(board, player, length):
+    # return the sequence of best moves stored in the transposition table from the position, at most length long
+    variation = []
+    try:
+        while len(variation) < length:
+            key, image = positionKey(board, player)
+            entry = table.probe(key)
+            if entry is None or entry[3] is None:
+                break
+            move = symmetry.mapMove(entry[3], symmetry.INVERSE[image])
+            if move not in board.generateMoves(board.getBoard(), player):
                 break
-        if best_move is None:
-            best_move = moves[0]
-        return minEval, best_move
+            board.makeMove(move)
+            variation.append(move)
+            player = "white" if player == "black" else "black"
+    finally:
+        for move in variation:
+            board.unmakeMove()
+    return variation
 
 
 def timeOut(timer):
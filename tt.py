@@ -0,0 +1,85 @@
+# The transposition table stores the results of the search by Zobrist key, so that positions reached through
+# different move orders are not searched again.
+# It is a fixed-size table of buckets with two entries: the first one keeps the deepest result (unless it comes from
+# an older search), the second one is always replaced. The entries live in NumPy arrays so that the memory used is
+# exactly the size asked for.
+
+import numpy as np
+
+# the kind of score stored in an entry
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# the bytes used by one entry: key, score, best move, depth, bound and generation
+ENTRY_BYTES = 8 + 4 + 2 + 1 + 1 + 1
+# an entry outside of the table, as written to the files of ttstore.py
+RECORD = np.dtype([("key", "<u8"), ("score", "<f4"), ("move", "<u2"), ("depth", "i1"), ("bound", "i1")])
+
+
+class TranspositionTable:
+
+    def __init__(self, size_mb=64):
+        self.buckets = max(1, int(size_mb * 1024 * 1024) // (2 * ENTRY_BYTES))
+        entries = 2 * self.buckets
+        self.keys = np.zeros(entries, dtype=np.uint64)
+        self.scores = np.zeros(entries, dtype=np.float32)
+        self.moves = np.zeros(entries, dtype=np.uint16)
+        self.depths = np.full(entries, -1, dtype=np.int8)
+        self.bounds = np.zeros(entries, dtype=np.int8)
+        self.generations = np.zeros(entries, dtype=np.uint8)
+        self.generation = 0
+
+    def newSearch(self):
+        # called before every move, the deep entries of the previous searches become replaceable
+        self.generation = (self.generation + 1) % 256
+
+    def clear(self):
+        self.keys[:] = 0
+        self.depths[:] = -1
+
+    def probe(self, key):
+        # return the (depth, bound, score, move) stored for the key, or None; move is None when there is no best move
+        index = 2 * (key % self.buckets)
+        if self.keys.item(index) != key:
+            index += 1
+            if self.keys.item(index) != key:
+                return None
+        move = self.moves.item(index)
+        return self.depths.item(index), self.bounds.item(index), self.scores.item(index), move if move else None
+
+    def store(self, key, depth, bound, score, move):
+        # store the result of a search, in the depth-preferred entry of the bucket when it is not deeper than the new
+        # one (or it is old), otherwise in the always-replace entry
+        index = 2 * (key % self.buckets)
+        if self.keys.item(index) != key and self.depths.item(index) > depth and \
+                self.generations.item(index) == self.generation:
+            index += 1
+        self.keys[index] = key
+        self.scores[index] = score
+        self.moves[index] = move or 0
+        self.depths[index] = depth
+        self.bounds[index] = bound
+        self.generations[index] = self.generation
+
+    def entries(self, min_depth=0):
+        # return the RECORD array of the entries searched at least min_depth deep
+        used = self.depths >= max(0, min_depth)
+        records = np.zeros(int(used.sum()), dtype=RECORD)
+        for field, column in (("key", self.keys), ("score", self.scores), ("move", self.moves),
+                              ("depth", self.depths), ("bound", self.bounds)):
+            records[field] = column[used]
+        return records
+
+    def insert(self, records):
+        # store the RECORD entries in the depth-preferred entries of their buckets, the deepest entry wins when two
+        # of them fall in the same bucket; the entries of the table deeper than them are kept
+        records = records[np.argsort(records["depth"], kind="stable")]
+        index = 2 * (records["key"] % np.uint64(self.buckets)).astype(np.int64)
+        keep = self.depths[index] <= records["depth"]
+        records, index = records[keep], index[keep]
+        # with repeated indices the last assignment wins, that is the deepest entry
+        self.keys[index] = records["key"]
+        self.scores[index] = records["score"]
+        self.moves[index] = records["move"]
+        self.depths[index] = records["depth"]
+        self.bounds[index] = records["bound"]
+        self.generations[index] = self.generation
@@ -0,0 +1,62 @@
+# Persistent transposition table: the deep results of the searches are saved to a file at the end of every game and
+# loaded into the transposition table when the player starts, so that the positions met again in later games (the
+# same openings, the usual middlegame structures) start with their depth already in hand.
+# The file is an array of tt.RECORD entries sorted by key, with one entry per key, the deepest one. Several players
+# can share it: a save takes an exclusive lock on the file path + ".lock", merges its entries with the ones on disk
+# and replaces the file at once, so the readers never see a half-written file.
+
+import fcntl
+import os
+
+import numpy as np
+
+import tt
+
+# only the results searched at least this deep are saved
+MIN_DEPTH = 3
+# the largest number of entries kept in the file, the deepest ones
+MAX_RECORDS = 1 << 20
+
+
+def read(path):
+    # return the entries of the file, mapped in memory, an empty array when there is no file
+    if not os.path.exists(path) or os.path.getsize(path) < tt.RECORD.itemsize:
+        return np.zeros(0, dtype=tt.RECORD)
+    return np.memmap(path, dtype=tt.RECORD, mode="r", shape=(os.path.getsize(path) // tt.RECORD.itemsize,))
+
+
+def merge(*arrays):
+    # return the entries of the arrays with one entry per key, the deepest one, sorted by key and at most MAX_RECORDS
+    records = np.concatenate(arrays)
+    # sorted by key, the deepest entry first for every key
+    records = records[np.lexsort((-records["depth"].astype(np.int16), records["key"]))]
+    first = np.ones(len(records), dtype=bool)
+    first[1:] = records["key"][1:] != records["key"][:-1]
+    records = records[first]
+    if len(records) > MAX_RECORDS:
+        deepest = np.argsort(-records["depth"].astype(np.int16), kind="stable")[:MAX_RECORDS]
+        records = records[np.sort(deepest)]
+    return records
+
+
+def load(table, path):
+    # load the entries of the file into the transposition table, return how many there were
+    records = read(path)
+    if len(records):
+        table.insert(np.array(records))
+    return len(records)
+
+
+def save(table, path, min_depth=MIN_DEPTH):
+    # merge the deep entries of the transposition table into the file, return the number of entries of the file; table
+    # may be anything with the entries method of the table, e.g. the workers of parallel.ParallelSearch
+    with open(path + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            records = merge(np.array(read(path)), table.entries(min_depth))
+            temporary = "%s.%d.tmp" % (path, os.getpid())
+            records.tofile(temporary)
+            os.replace(temporary, path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return len(records)
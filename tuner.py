@@ -0,0 +1,178 @@
+# Tuning of the heuristic weights (heuristics.DEFAULT_WEIGHTS) with Texel's method: the positions of self-play games
+# are labelled with the result of their game (1 BLACK won, 0 WHITE won, 0.5 draw) and the weights are moved to make
+# sigmoid(K * heuristic) predict the labels, minimizing the mean squared error.
+# The heuristic is linear in its weights, so every position is turned once into its features (the terms the weights
+# multiply, see features) and the score of a weight vector is a product of matrices. The games are read and the
+# candidate weights are scored on a process pool, and the state of the fit is checkpointed to a JSON file after every
+# pass, so that a stopped run resumes where it was. The checkpoint is read by "player.py --weights".
+#
+# Run it with e.g. "python3 tuner.py games.jsonl --checkpoint weights.json", where games.jsonl comes from
+# selfplay.py; "--selfplay 200" first plays 200 more games with the weights of the checkpoint.
+
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import BitBoard
+import Move
+import escape
+import heuristics
+
+PARAMETERS = tuple(heuristics.DEFAULT_WEIGHTS)
+# the weights of won and lost games are not tuned, the positions are never terminal
+TUNED = tuple(name for name in PARAMETERS if name not in ("king_escaped", "king_captured"))
+# the first moves of every game are left out, they are the same in most games
+SKIP_PLIES = 4
+LEVEL_NAMES = {1: "quadrant_best", 0.5: "quadrant_good", 0.25: "quadrant_poor"}
+
+
+def features(board):
+    # return the features of the position: heuristics.heuristic(board, 0) is features(board) @ the weights in the
+    # order of PARAMETERS
+    values = dict.fromkeys(PARAMETERS, 0.0)
+    if board.isKingSurrounded():
+        values["king_surrounded"] = board.nEnemiesCloseToKing()
+    if board.isKingNearThrone():
+        values["king_near_throne"] = -1
+    if board.isKingAtEdge():
+        values["king_escaped"] = -1
+    distance = escape.escapeDistance(board)
+    if 1 <= distance <= 3:
+        values["escape_%d" % distance] = -1
+    if board.isKingCaptured():
+        values["king_captured"] = 1
+    white_pieces, black_pieces = board.getWhitePieces(), board.getBlackPieces()
+    values["white_extra_piece"] = -max(0, white_pieces - black_pieces)
+    values["black_extra_piece"] = max(0, black_pieces - white_pieces)
+    king_x, king_y = board.getKing()
+    levels = heuristics.quadrant_levels(king_x[0], king_y[0], board.getCenterCoordinate())
+    for level, count in zip(levels, board.getBlackQuadrantCounts()):
+        values[LEVEL_NAMES[level]] += count
+    values["black_eat"] = board.countBlackEaters()
+    values["white_eat"] = -board.countWhiteEaters()
+    values["white_block"] = -board.countWhiteBlockers()
+    return [values[name] for name in PARAMETERS]
+
+
+def gamePositions(game):
+    # return the (features, label) of the positions of a game recorded by selfplay.py
+    label = {"black": 1.0, "white": 0.0}.get(game["winner"], 0.5)
+    board = BitBoard.BitBoard()
+    rows = []
+    for ply, move in enumerate(game["moves"][:-1]):
+        board.makeMove(Move.fromString(move))
+        if ply + 1 >= SKIP_PLIES:
+            rows.append(features(board))
+    return rows, [label] * len(rows)
+
+
+def loadPositions(path, executor):
+    # return the features matrix and the labels of the positions of the games of the file
+    with open(path) as file:
+        games = [json.loads(line) for line in file if line.strip()]
+    matrix, labels = [], []
+    for rows, game_labels in executor.map(gamePositions, games, chunksize=16):
+        matrix.extend(rows)
+        labels.extend(game_labels)
+    return np.array(matrix, dtype=float).reshape(-1, len(PARAMETERS)), np.array(labels)
+
+
+# the positions of the worker processes, set by _initWorker
+_matrix = _labels = None
+
+
+def _initWorker(matrix, labels):
+    global _matrix, _labels
+    _matrix, _labels = matrix, labels
+
+
+def loss(vector, k):
+    # return the mean squared error of the predictions of the weight vector
+    scores = np.clip(k * (_matrix @ vector), -50, 50)
+    return float(np.mean((_labels - 1 / (1 + np.exp(-scores))) ** 2))
+
+
+def losses(executor, vectors, k):
+    return list(executor.map(loss, vectors, [k] * len(vectors)))
+
+
+def fitK(executor, vector):
+    # return the scale of the sigmoid which fits the labels best with the weights given
+    candidates = [float(k) for k in np.geomspace(1e-4, 1, 41)]
+    scores = list(executor.map(loss, [vector] * len(candidates), candidates))
+    return candidates[int(np.argmin(scores))]
+
+
+def saveCheckpoint(path, state):
+    temporary = path + ".tmp"
+    with open(temporary, "w") as file:
+        json.dump(state, file, indent=2)
+    os.replace(temporary, path)
+
+
+def tune(matrix, labels, checkpoint, workers, passes, min_step):
+    # fit the weights by local search: every pass tries to move every weight up and down by its step, keeps the best
+    # move, and halves the steps when no move helps
+    state = {"weights": dict(heuristics.DEFAULT_WEIGHTS), "pass": 0}
+    if os.path.exists(checkpoint):
+        with open(checkpoint) as file:
+            state.update(json.load(file))
+    vector = np.array([state["weights"][name] for name in PARAMETERS], dtype=float)
+    steps = state.get("steps") or {name: max(abs(state["weights"][name]) * 0.2, min_step) for name in TUNED}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_initWorker, initargs=(matrix, labels)) as executor:
+        k = state.get("k") or fitK(executor, vector)
+        best = loss_now = losses(executor, [vector], k)[0]
+        while state["pass"] < passes and max(steps.values()) >= min_step:
+            candidates = []
+            for name in TUNED:
+                index = PARAMETERS.index(name)
+                for sign in (1, -1):
+                    candidate = vector.copy()
+                    candidate[index] += sign * steps[name]
+                    candidates.append(candidate)
+            scores = losses(executor, candidates, k)
+            choice = int(np.argmin(scores))
+            if scores[choice] < best:
+                vector, best = candidates[choice], scores[choice]
+            else:
+                steps = {name: step / 2 for name, step in steps.items()}
+            state.update(weights={name: float(value) for name, value in zip(PARAMETERS, vector)}, steps=steps, k=k,
+                         loss=best, initial_loss=state.get("initial_loss", loss_now), positions=len(labels))
+            state["pass"] += 1
+            saveCheckpoint(checkpoint, state)
+            print("pass %d loss %.6f" % (state["pass"], best))
+    return state
+
+
+def selfplay(games_path, games, timeout, checkpoint):
+    # play games between two copies of the player with the weights of the checkpoint, appended to games_path
+    import selfplay as runner
+    engine = "player.py --book ''" + (" --weights %s" % os.path.abspath(checkpoint) if os.path.exists(checkpoint)
+                                      else "")
+    args = argparse.Namespace(a=engine, b=engine, games=games, concurrency=max(1, (os.cpu_count() or 2) // 2),
+                              timeout=timeout, port=6800, verbose=False)
+    with open(games_path, "a") as output:
+        asyncio.run(runner.playMatch(args, output))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="tune the heuristic weights on self-play games")
+    parser.add_argument("games", help="JSON lines of the games, as written by selfplay.py")
+    parser.add_argument("--checkpoint", default="weights.json", help="state of the fit, resumed when it exists")
+    parser.add_argument("--selfplay", type=int, default=0, help="games to play and append to the games first")
+    parser.add_argument("--timeout", type=float, default=2, help="seconds per move of the self-play games")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--passes", type=int, default=200)
+    parser.add_argument("--min-step", type=float, default=0.01)
+    args = parser.parse_args()
+    if args.selfplay:
+        selfplay(args.games, args.selfplay, args.timeout, args.checkpoint)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        matrix, labels = loadPositions(args.games, pool)
+    print("%d positions" % len(labels))
+    result = tune(matrix, labels, args.checkpoint, args.workers, args.passes, args.min_step)
+    print(json.dumps(result["weights"], indent=2))
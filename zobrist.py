@@ -0,0 +1,27 @@
+# Zobrist keys of the positions: every (piece, square) pair has a random 64-bit key and the key of a position is the
+# XOR of the keys of its pieces, so that the boards can update it with two or three XORs per move.
+# The keys come from a fixed seed so that they are the same in every process (and in the files storing them).
+
+import random
+
+SQUARES = 81
+
+_random = random.Random(20221127)
+# KEYS[piece][square], with the piece values used by Board (1 white, 2 black, 3 KING); KEYS[0] is all zeros so that
+# empty squares can be hashed too
+KEYS = [[0] * SQUARES] + [[_random.getrandbits(64) for sq in range(SQUARES)] for piece in range(3)]
+# XORed to the key of a position when BLACK is the player to move
+BLACK_TO_MOVE = _random.getrandbits(64)
+
+
+def keyOf(squares):
+    # return the key of the position given as an iterable of (piece, square) pairs
+    key = 0
+    for piece, sq in squares:
+        key ^= KEYS[piece][sq]
+    return key
+
+
+def searchKey(key, player):
+    # return the key of the position with the player to move
+    return key ^ BLACK_TO_MOVE if player == "black" else key